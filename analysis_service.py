@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+反诈骗语音分析 HTTP 服务
+基于 asyncio 的本地 HTTP 服务，封装 deepseek_analyzer 的“转录 + LLM 分析”流程：
+  - POST /analyze?filename=xxx.wav  请求体为音频文件原始字节，返回与 analyze_audio_for_scam 相同结构的 JSON
+  - GET  /health                     返回队列状态
+并发请求在短时间窗口内合并成微批次交给 ASR 模型，LLM 调用并发执行；
+队列已满时直接返回 429，避免请求无限堆积。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024  # 单个上传文件上限 20MB
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+                429: "Too Many Requests", 500: "Internal Server Error"}
+
+
+class QueueFullError(Exception):
+    """服务过载，请求被拒绝（对应 HTTP 429）"""
+
+
+def load_default_backends():
+    """加载真实模型：Whisper 批量转录 + DeepSeek 分析（导入 deepseek_analyzer 时会加载模型）"""
+    import deepseek_analyzer
+    from batch_transcriber import transcribe_batch
+
+    def transcribe_micro_batch(audio_paths: List[str]) -> List[str]:
+        return transcribe_batch(deepseek_analyzer.asr_model, audio_paths, batch_size=len(audio_paths))
+
+    return transcribe_micro_batch, deepseek_analyzer.analyze_scam_with_llm
+
+
+def make_standin_backends(asr_fixed_ms: float = 200, asr_per_clip_ms: float = 50, llm_ms: float = 800):
+    """
+    本地替身模型，用于压测与联调，不需要加载 Whisper 也不消耗 LLM 配额。
+    ASR 耗时 = 固定开销 + 每条开销 × 批大小，模拟批处理对固定开销的摊薄。
+    """
+    def transcribe_batch(audio_paths: List[str]) -> List[str]:
+        time.sleep((asr_fixed_ms + asr_per_clip_ms * len(audio_paths)) / 1000)
+        return [f"这里是模拟转录文本，请提供您的验证码。({os.path.basename(p)})" for p in audio_paths]
+
+    def analyze_text(text: str) -> Dict:
+        time.sleep(llm_ms / 1000)
+        return {
+            "legitimacy_checks": {"official_channel_guidance": False, "harmless_action_statement": False,
+                                  "is_information_sync": False},
+            "final_assessment": {"is_scam": True, "risk_level": "高风险", "scam_type": "索要验证码",
+                                 "reasoning": "本地替身模型的固定结果。"}
+        }
+
+    return transcribe_batch, analyze_text
+
+
+class AnalysisService:
+    """ASR 微批处理 + LLM 并发调用 + 队列限流"""
+
+    def __init__(self, transcribe_batch: Callable[[List[str]], List[str]], analyze_text: Callable[[str], Dict],
+                 max_batch_size: int = 8, max_batch_wait: float = 0.05,
+                 max_queue: int = 64, max_inflight: int = 256, llm_concurrency: int = 8):
+        self.transcribe_batch = transcribe_batch
+        self.analyze_text = analyze_text
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait
+        self.max_queue = max_queue
+        self.max_inflight = max_inflight
+
+        self.inflight = 0
+        self.batch_sizes = []
+        self._asr_queue: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        # ASR 模型单线程串行执行；LLM 为网络调用，用线程池并发
+        self._asr_executor = ThreadPoolExecutor(max_workers=1)
+        self._llm_executor = ThreadPoolExecutor(max_workers=llm_concurrency)
+
+    async def start(self):
+        self._asr_queue = asyncio.Queue(maxsize=self.max_queue)
+        self._batch_task = asyncio.create_task(self._batch_loop())
+
+    async def stop(self):
+        if self._batch_task:
+            self._batch_task.cancel()
+            try:
+                await self._batch_task
+            except asyncio.CancelledError:
+                pass
+        self._asr_executor.shutdown(wait=False)
+        self._llm_executor.shutdown(wait=False)
+
+    async def _batch_loop(self):
+        """收集微批次：拿到第一条请求后，最多再等 max_batch_wait 秒或凑满 max_batch_size 条"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._asr_queue.get()]
+            deadline = loop.time() + self.max_batch_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._asr_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batch_sizes.append(len(batch))
+            audio_paths = [audio_path for audio_path, _ in batch]
+            try:
+                texts = await loop.run_in_executor(self._asr_executor, self.transcribe_batch, audio_paths)
+                for (_, future), text in zip(batch, texts):
+                    if not future.done():
+                        future.set_result(text)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._fail(batch[0][1], e)
+                    continue
+                # 批量转录失败（例如其中一个上传无法解码）时逐条重试，只让出错的请求失败
+                for audio_path, future in batch:
+                    try:
+                        text = (await loop.run_in_executor(self._asr_executor, self.transcribe_batch, [audio_path]))[0]
+                    except Exception as item_error:
+                        self._fail(future, item_error)
+                    else:
+                        if not future.done():
+                            future.set_result(text)
+
+    @staticmethod
+    def _fail(future: asyncio.Future, error: Exception):
+        if not future.done():
+            future.set_exception(error)
+
+    async def analyze(self, audio_bytes: bytes, filename: str) -> Dict:
+        """分析一段上传的音频，返回结构与 analyze_audio_for_scam 一致"""
+        if self.inflight >= self.max_inflight:
+            raise QueueFullError(f"in-flight requests exceed {self.max_inflight}")
+
+        loop = asyncio.get_running_loop()
+        result = {"filename": filename, "transcription": "", "llm_analysis": None}
+        suffix = os.path.splitext(filename)[1] or ".wav"
+        fd, audio_path = tempfile.mkstemp(suffix=suffix)
+        self.inflight += 1
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio_bytes)
+
+            future = loop.create_future()
+            try:
+                self._asr_queue.put_nowait((audio_path, future))
+            except asyncio.QueueFull:
+                raise QueueFullError(f"ASR queue exceeds {self.max_queue}")
+
+            try:
+                transcribed_text = await future
+            except Exception as e:
+                result["transcription"] = f"Error: {e}"
+                return result
+
+            result["transcription"] = transcribed_text
+            if transcribed_text:
+                result["llm_analysis"] = await loop.run_in_executor(
+                    self._llm_executor, self.analyze_text, transcribed_text
+                )
+            return result
+        finally:
+            self.inflight -= 1
+            try:
+                os.remove(audio_path)
+            except OSError:
+                pass
+
+    def health(self) -> Dict:
+        return {
+            "status": "ok",
+            "asr_queued": self._asr_queue.qsize() if self._asr_queue else 0,
+            "inflight": self.inflight,
+            "batches": len(self.batch_sizes),
+            "avg_batch_size": sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0,
+        }
+
+    # --- HTTP 层（每个连接处理一个请求，Connection: close） ---
+
+    async def _route(self, method: str, target: str, body: bytes):
+        url = urlsplit(target)
+        if method == "GET" and url.path == "/health":
+            return 200, self.health()
+        if method == "POST" and url.path == "/analyze":
+            if not body:
+                return 400, {"error": "empty upload"}
+            filename = parse_qs(url.query).get("filename", ["upload.wav"])[0]
+            try:
+                return 200, await self.analyze(body, os.path.basename(filename))
+            except QueueFullError as e:
+                return 429, {"error": f"server busy: {e}"}
+        return 404, {"error": f"no route for {method} {url.path}"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            content_length = int(headers.get("content-length", 0))
+            if content_length > MAX_UPLOAD_BYTES:
+                status, payload = 413, {"error": f"upload exceeds {MAX_UPLOAD_BYTES} bytes"}
+            else:
+                body = await reader.readexactly(content_length) if content_length else b""
+                status, payload = await self._route(method, target, body)
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            status, payload = 400, {"error": f"malformed request: {e}"}
+        except Exception as e:
+            print(f"   [SERVICE ERROR] {e}")
+            status, payload = 500, {"error": str(e)}
+
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + data
+        )
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+        await self.start()
+        return await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+
+
+async def run_service(args):
+    if args.standin:
+        print("🧪 使用本地替身模型（不加载 Whisper / 不调用 LLM）")
+        transcribe_batch, analyze_text = make_standin_backends()
+    else:
+        transcribe_batch, analyze_text = load_default_backends()
+
+    service = AnalysisService(
+        transcribe_batch, analyze_text,
+        max_batch_size=args.batch_size, max_batch_wait=args.batch_wait_ms / 1000,
+        max_queue=args.max_queue, max_inflight=args.max_inflight, llm_concurrency=args.llm_concurrency
+    )
+    server = await service.serve(args.host, args.port)
+    print(f"✅ 分析服务已启动: http://{args.host}:{args.port}  (POST /analyze, GET /health)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='反诈骗语音分析 HTTP 服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='监听端口 (默认: 8000)')
+    parser.add_argument('--batch-size', type=int, default=8, help='ASR 微批次最大条数 (默认: 8)')
+    parser.add_argument('--batch-wait-ms', type=float, default=50, help='ASR 微批次最长等待时间，毫秒 (默认: 50)')
+    parser.add_argument('--max-queue', type=int, default=64, help='ASR 等待队列上限，超出返回 429 (默认: 64)')
+    parser.add_argument('--max-inflight', type=int, default=256, help='同时处理中的请求上限，超出返回 429 (默认: 256)')
+    parser.add_argument('--llm-concurrency', type=int, default=8, help='LLM 并发调用数 (默认: 8)')
+    parser.add_argument('--standin', action='store_true', help='使用本地替身模型，用于联调和压测')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_service(args))
+    except KeyboardInterrupt:
+        print("\n✅ 服务已停止。")
+
+
+if __name__ == "__main__":
+    main()
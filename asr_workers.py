@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多进程 ASR 工作池（共享模型权重）
+每个进程各自调用 whisper.load_model 会让内存占用和启动时间随进程数成倍增长。
+共享模式下主进程只加载一次模型，把参数移到共享内存（model.share_memory()）后再 fork 出工作进程，
+子进程直接使用同一份只读权重，只为自己的推理中间结果分配内存。
+独立模式（share_weights=False）下每个进程用 spawn 启动并各自加载模型，作为对照。
+"""
+
+import multiprocessing as mp
+import os
+import queue
+from typing import Dict, List, Optional
+
+import torch
+import whisper
+
+from batch_transcriber import transcribe_batch
+
+# fork 出的子进程通过这个全局变量拿到主进程加载好的模型
+_shared_model = None
+
+
+def _worker_main(model_name: str, task_queue, result_queue, batch_size: int):
+    # 每个进程只用一个计算线程，避免多进程 × 多线程争抢 CPU
+    torch.set_num_threads(1)
+    model = _shared_model if _shared_model is not None else whisper.load_model(model_name, device="cpu")
+    result_queue.put(("ready", os.getpid(), None))
+
+    with torch.inference_mode():
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            indices, audio_paths = task
+            # 先报告手上的任务，进程被杀（例如 OOM）时主进程据此知道哪些音频不会有结果
+            result_queue.put(("started", os.getpid(), indices))
+            try:
+                texts = transcribe_batch(model, audio_paths, batch_size=batch_size, fp16=False)
+            except Exception as e:
+                texts = [f"Error: {e}"] * len(audio_paths)
+            result_queue.put(("result", os.getpid(), (indices, texts)))
+
+
+def read_process_memory(pid: int) -> Dict[str, int]:
+    """读取进程的 RSS 和 PSS（字节）。PSS 按共享页面的进程数均摊，求和后就是真实总占用"""
+    memory = {"rss": 0, "pss": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    memory[key.lower()] = int(value.split()[0]) * 1024
+    except OSError:
+        # 非 Linux 或内核不支持 smaps_rollup 时只能拿到 RSS
+        import resource
+        if pid == os.getpid():
+            memory["rss"] = memory["pss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return memory
+
+
+class AsrWorkerPool:
+    """Whisper 多进程转录池"""
+
+    def __init__(self, model_name: str = "base", num_workers: int = 4, share_weights: bool = True,
+                 batch_size: int = 1):
+        self.model_name = model_name
+        self.num_workers = num_workers
+        self.share_weights = share_weights
+        self.batch_size = batch_size
+        self.workers: List[mp.Process] = []
+        self._task_queue = None
+        self._result_queue = None
+
+    def start(self):
+        global _shared_model
+        if self.share_weights:
+            # 先加载、后 fork：子进程继承同一份共享内存中的权重
+            # 注意加载后不要在主进程里做推理，否则 OpenMP 线程池状态被 fork 复制可能导致子进程卡死
+            model = whisper.load_model(self.model_name, device="cpu")
+            model.eval()
+            model.share_memory()
+            _shared_model = model
+            ctx = mp.get_context("fork")
+        else:
+            ctx = mp.get_context("spawn")
+
+        self._task_queue = ctx.Queue()
+        self._result_queue = ctx.Queue()
+        for _ in range(self.num_workers):
+            worker = ctx.Process(
+                target=_worker_main,
+                args=(self.model_name, self._task_queue, self._result_queue, self.batch_size),
+                daemon=True
+            )
+            worker.start()
+            self.workers.append(worker)
+
+    def transcribe(self, audio_paths: List[str], on_first_result=None,
+                   poll_interval: float = 1.0) -> List[Optional[str]]:
+        """
+        分发所有音频并按输入顺序返回转录文本；收到第一条结果时调用 on_first_result()。
+        工作进程意外退出时，它正在处理的音频返回 "Error: worker exited"；全部退出时剩余音频同样处理，不会一直等待。
+        """
+        for start in range(0, len(audio_paths), self.batch_size):
+            indices = list(range(start, min(start + self.batch_size, len(audio_paths))))
+            self._task_queue.put((indices, [audio_paths[i] for i in indices]))
+
+        texts: List[Optional[str]] = [None] * len(audio_paths)
+        in_progress: Dict[int, List[int]] = {}
+        received, stalled = 0, 0
+
+        def fail(indices):
+            nonlocal received
+            for i in indices:
+                if texts[i] is None:
+                    texts[i] = "Error: worker exited"
+                    received += 1
+
+        while received < len(audio_paths):
+            try:
+                kind, pid, payload = self._result_queue.get(timeout=poll_interval)
+            except queue.Empty:
+                kind = None
+
+            if kind == "started":
+                in_progress[pid] = payload
+            elif kind == "result":
+                indices, results = payload
+                in_progress.pop(pid, None)
+                if received == 0 and on_first_result:
+                    on_first_result()
+                for i, text in zip(indices, results):
+                    if texts[i] is None:
+                        texts[i] = text
+                        received += 1
+            if kind is not None:
+                continue
+
+            dead = [w for w in self.workers if not w.is_alive()]
+            for worker in dead:
+                if worker.pid in in_progress:
+                    print(f"⚠️ 工作进程 {worker.pid} 已退出 (exitcode={worker.exitcode})")
+                    fail(in_progress.pop(worker.pid))
+            alive = [w for w in self.workers if w.is_alive()]
+            # 没有存活进程，或进程在上报任务之前就退出、队列已空而其余进程连续两轮都空闲时，剩余音频不会再有结果
+            stalled = stalled + 1 if dead and not in_progress and self._task_queue.empty() else 0
+            if not alive or stalled >= 2:
+                fail(range(len(audio_paths)))
+        return texts
+
+    def memory_usage(self) -> Dict[str, int]:
+        """主进程 + 所有工作进程的 RSS 总和与 PSS 总和（字节）"""
+        total = {"rss": 0, "pss": 0}
+        for pid in [os.getpid()] + [w.pid for w in self.workers if w.is_alive()]:
+            memory = read_process_memory(pid)
+            total["rss"] += memory["rss"]
+            total["pss"] += memory["pss"]
+        return total
+
+    def close(self):
+        global _shared_model
+        for _ in self.workers:
+            self._task_queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=30)
+            if worker.is_alive():
+                worker.terminate()
+        self.workers = []
+        _shared_model = None
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+离线音频增强
+每个变体都去调用一次百度 / 阿里云 TTS 既耗配额又慢。这里在本地用 NumPy 向量化实现常见增强，
+把每条合成好的音频扩展成多个变体：
+  - 变速（语速和音调一起变）
+  - 变调（相位声码器时间伸缩 + 重采样，时长不变）
+  - 按指定信噪比叠加噪声
+  - 电话信道模拟：300-3400Hz 带通、降采样到 8kHz、G.711 μ-law 编解码，再升回 16kHz
+  - 音量增益
+多进程并行处理，输出文件名在原文件名后追加 _aug 后缀，保留 generated_audio.py 的
+{label}_{text_id}_voice{v}_spd{s}_pit{p} 前缀，标签解析方式不变。
+用法:
+  python audio_augment.py generated_audio_baidu_验证码 -o augmented_验证码 --variants 20
+  python audio_augment.py corpus_验证码 -o corpus_验证码_aug --shards   # 分片语料进、分片语料出
+"""
+
+import argparse
+import itertools
+import multiprocessing as mp
+import os
+import time
+import wave
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from audio_shards import SAMPLE_RATE, ShardReader, ShardWriter, is_shard_corpus, parse_clip_name
+
+N_FFT = 512
+HOP = 128
+WINDOW = np.hanning(N_FFT + 1)[:-1].astype(np.float32)
+
+# 每个变体从以下取值的组合中抽取（不含全部为默认值的组合）
+DEFAULT_GRID = {
+    "speed": [0.9, 1.0, 1.1],
+    "pitch": [-2, -1, 0, 1, 2],
+    "snr": [None, 20, 10, 5],
+    "telephony": [False, True],
+    "gain": [-6, 0, 6],
+}
+
+
+# --- 基础变换 ---
+
+def change_speed(audio: np.ndarray, factor: float) -> np.ndarray:
+    """线性插值重采样：factor > 1 变快变短、音调升高"""
+    if factor == 1.0:
+        return audio
+    positions = np.arange(int(round(len(audio) / factor))) * factor
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def _stft(audio: np.ndarray) -> np.ndarray:
+    padded = np.pad(audio, (N_FFT // 2, N_FFT // 2))
+    frames = sliding_window_view(padded, N_FFT)[::HOP]
+    return np.fft.rfft(frames * WINDOW, axis=1)
+
+
+def _istft(spec: np.ndarray, length: int) -> np.ndarray:
+    frames = np.fft.irfft(spec, n=N_FFT, axis=1).astype(np.float32) * WINDOW
+    num_frames, overlap = frames.shape[0], N_FFT // HOP
+    blocks = frames.reshape(num_frames, overlap, HOP)
+    window_sq = (WINDOW ** 2).reshape(overlap, HOP)
+
+    out = np.zeros((num_frames + overlap - 1, HOP), dtype=np.float32)
+    norm = np.zeros_like(out)
+    for k in range(overlap):
+        out[k:k + num_frames] += blocks[:, k]
+        norm[k:k + num_frames] += window_sq[k]
+    out = (out / np.maximum(norm, 1e-8)).ravel()
+    return out[N_FFT // 2:N_FFT // 2 + length]
+
+
+def time_stretch(audio: np.ndarray, rate: float) -> np.ndarray:
+    """相位声码器时间伸缩：rate > 1 变短，音调不变"""
+    spec = _stft(audio)
+    if spec.shape[0] < 2:
+        return audio
+    steps = np.arange(0, spec.shape[0] - 1, rate)
+    i0 = steps.astype(int)
+    frac = (steps - i0)[:, None]
+
+    magnitude = (1 - frac) * np.abs(spec[i0]) + frac * np.abs(spec[i0 + 1])
+    expected = 2 * np.pi * HOP * np.arange(spec.shape[1]) / N_FFT
+    delta = np.angle(spec[i0 + 1]) - np.angle(spec[i0]) - expected
+    delta -= 2 * np.pi * np.round(delta / (2 * np.pi))
+    increments = np.vstack([np.zeros((1, spec.shape[1])), (expected + delta)[:-1]])
+    phase = np.angle(spec[0]) + np.cumsum(increments, axis=0)
+
+    return _istft(magnitude * np.exp(1j * phase), int(round(len(audio) / rate)))
+
+
+def pitch_shift(audio: np.ndarray, semitones: float) -> np.ndarray:
+    """变调不变速：先时间伸缩，再重采样回原长度"""
+    if semitones == 0:
+        return audio
+    factor = 2 ** (semitones / 12)
+    shifted = change_speed(time_stretch(audio, 1 / factor), factor)
+    return _fit_length(shifted, len(audio))
+
+
+def add_noise(audio: np.ndarray, snr_db: float, rng: np.random.Generator) -> np.ndarray:
+    """叠加高斯白噪声，使信噪比为 snr_db"""
+    signal_power = float(np.mean(audio ** 2))
+    if signal_power == 0:
+        return audio
+    noise = rng.standard_normal(len(audio)).astype(np.float32)
+    noise *= np.sqrt(signal_power / (10 ** (snr_db / 10)))
+    return audio + noise
+
+
+def _lowpass_fir(cutoff_hz: float, sample_rate: int, taps: int = 101) -> np.ndarray:
+    n = np.arange(taps) - (taps - 1) / 2
+    h = 2 * cutoff_hz / sample_rate * np.sinc(2 * cutoff_hz / sample_rate * n) * np.hamming(taps)
+    return (h / h.sum()).astype(np.float32)
+
+
+BANDPASS_16K = _lowpass_fir(3400, SAMPLE_RATE) - _lowpass_fir(300, SAMPLE_RATE)
+LOWPASS_16K = _lowpass_fir(3400, SAMPLE_RATE)
+
+
+def telephony(audio: np.ndarray, mu: int = 255) -> np.ndarray:
+    """电话信道：300-3400Hz 带通 -> 8kHz -> G.711 μ-law 8-bit 编解码 -> 升回 16kHz"""
+    narrow = np.convolve(audio, BANDPASS_16K, mode="same")[::2]
+    narrow = np.clip(narrow, -1, 1)
+    companded = np.sign(narrow) * np.log1p(mu * np.abs(narrow)) / np.log1p(mu)
+    quantized = np.round((companded + 1) / 2 * mu) / mu * 2 - 1
+    decoded = np.sign(quantized) * ((1 + mu) ** np.abs(quantized) - 1) / mu
+    upsampled = np.interp(np.arange(len(audio)) / 2, np.arange(len(decoded)), decoded)
+    return np.convolve(upsampled, LOWPASS_16K, mode="same").astype(np.float32)
+
+
+def apply_gain(audio: np.ndarray, gain_db: float) -> np.ndarray:
+    return audio * np.float32(10 ** (gain_db / 20))
+
+
+def _fit_length(audio: np.ndarray, length: int) -> np.ndarray:
+    if len(audio) >= length:
+        return audio[:length]
+    return np.pad(audio, (0, length - len(audio)))
+
+
+# --- 变体生成 ---
+
+def sample_recipes(name: str, variants: int, seed: int, grid: Dict[str, List] = DEFAULT_GRID) -> List[Dict]:
+    """为一条音频确定性地抽取 variants 个互不相同的参数组合"""
+    neutral = {"speed": 1.0, "pitch": 0, "snr": None, "telephony": False, "gain": 0}
+    keys = list(grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    combos = [c for c in combos if any(c[k] != neutral[k] for k in keys)]
+    rng = np.random.default_rng([seed, zlib.crc32(name.encode("utf-8"))])
+    picks = rng.choice(len(combos), size=min(variants, len(combos)), replace=False)
+    return [combos[i] for i in sorted(picks)]
+
+
+def recipe_tag(index: int, recipe: Dict) -> str:
+    """把参数组合编码进文件名后缀，只写出非默认值"""
+    parts = [f"aug{index:02d}"]
+    if recipe["speed"] != 1.0: parts.append(f"x{recipe['speed']:g}")
+    if recipe["pitch"]: parts.append(f"st{recipe['pitch']:+d}")
+    if recipe["snr"] is not None: parts.append(f"snr{recipe['snr']}")
+    if recipe["telephony"]: parts.append("tel")
+    if recipe["gain"]: parts.append(f"g{recipe['gain']:+d}")
+    return "_".join(parts)
+
+
+def augment(audio: np.ndarray, recipe: Dict, rng: np.random.Generator) -> np.ndarray:
+    out = change_speed(audio, recipe["speed"])
+    out = pitch_shift(out, recipe["pitch"])
+    if recipe["snr"] is not None:
+        out = add_noise(out, recipe["snr"], rng)
+    if recipe["telephony"]:
+        out = telephony(out)
+    out = apply_gain(out, recipe["gain"])
+    return np.clip(out, -1, 1)
+
+
+def to_pcm16(audio: np.ndarray) -> bytes:
+    return (audio * 32767).astype("<i2").tobytes()
+
+
+def augmented_name(filename: str, tag: str) -> str:
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}_{tag}{ext or '.wav'}"
+
+
+def variant_metadata(filename: str, recipe: Dict, tag: str) -> Dict[str, str]:
+    """
+    变体在分片索引中的元数据：沿用原音频的标签和音色，aug 记录参数标签。
+    变速 / 变调后原来的合成语速 / 语调已不再准确，对应的 spd / pit 留空。
+    """
+    meta = parse_clip_name(filename)
+    if recipe["speed"] != 1.0:
+        meta["spd"] = ""
+    if recipe["pitch"]:
+        meta["pit"] = ""
+    meta["aug"] = tag
+    return meta
+
+
+# --- 多进程处理 ---
+
+_shard_reader: Optional[ShardReader] = None
+
+
+def _load_source(source: Tuple) -> np.ndarray:
+    global _shard_reader
+    if source[0] == "shard":
+        _, corpus_dir, index = source
+        if _shard_reader is None:
+            _shard_reader = ShardReader(corpus_dir)
+        return _shard_reader.as_float32(index)
+
+    with wave.open(source[1], "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"需要 {SAMPLE_RATE}Hz 16-bit 单声道 WAV")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _augment_clip(job: Tuple) -> Tuple[str, List[Tuple[str, Dict, str, bytes]], Optional[str]]:
+    """处理一条音频的全部变体，返回 (原文件名, [(变体文件名, 参数组合, 参数标签, PCM), ...], 错误信息)"""
+    filename, source, variants, seed = job
+    try:
+        audio = _load_source(source)
+    except Exception as e:
+        return filename, [], str(e)
+
+    outputs = []
+    for index, recipe in enumerate(sample_recipes(filename, variants, seed)):
+        rng = np.random.default_rng([seed, zlib.crc32(filename.encode("utf-8")), index])
+        tag = recipe_tag(index, recipe)
+        outputs.append((augmented_name(filename, tag), recipe, tag, to_pcm16(augment(audio, recipe, rng))))
+    return filename, outputs, None
+
+
+def write_wav(path: str, pcm: bytes):
+    # 分片语料的条目名带来源目录前缀（见 audio_shards.clip_name），输出时保留这一层目录
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线音频增强：变速 / 变调 / 加噪 / 电话信道 / 增益')
+    parser.add_argument('source', help='WAV 目录或分片语料目录')
+    parser.add_argument('-o', '--output', required=True, help='输出目录')
+    parser.add_argument('--variants', type=int, default=20, help='每条音频生成的变体数 (默认: 20)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='并行进程数 (默认: CPU 核数)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子，相同种子生成相同变体 (默认: 0)')
+    parser.add_argument('--shards', action='store_true', help='输出为分片语料（见 audio_shards.py）而不是 WAV 文件')
+    args = parser.parse_args()
+
+    if is_shard_corpus(args.source):
+        reader = ShardReader(args.source)
+        jobs = [(entry["name"], ("shard", args.source, index), args.variants, args.seed)
+                for index, entry in enumerate(reader.entries)]
+    elif os.path.isdir(args.source):
+        jobs = [(f, ("wav", os.path.join(args.source, f)), args.variants, args.seed)
+                for f in sorted(os.listdir(args.source)) if f.lower().endswith(".wav")]
+    else:
+        print(f"❌ 找不到输入目录: {args.source}")
+        return
+    if not jobs:
+        print(f"在 '{args.source}' 中没有找到音频。")
+        return
+
+    writer = ShardWriter(args.output) if args.shards else None
+    existing = 0
+    if writer:
+        # 对已有分片语料重复运行时跳过已经写入的变体，避免索引中出现重复的文件名
+        pending_jobs = []
+        for job in jobs:
+            names = [augmented_name(job[0], recipe_tag(index, recipe))
+                     for index, recipe in enumerate(sample_recipes(job[0], args.variants, args.seed))]
+            if all(name in writer.names for name in names):
+                existing += len(names)
+            else:
+                pending_jobs.append(job)
+        jobs = pending_jobs
+    else:
+        os.makedirs(args.output, exist_ok=True)
+
+    print(f"🎛️ {len(jobs)} 条音频 × {args.variants} 个变体，{args.workers} 个进程 -> {args.output}")
+    if existing:
+        print(f"   跳过 {existing} 个已存在的变体")
+    start = time.perf_counter()
+    produced, produced_samples, failed = 0, 0, 0
+    try:
+        with mp.Pool(args.workers) as pool:
+            for filename, outputs, error in pool.imap_unordered(_augment_clip, jobs, chunksize=4):
+                if error:
+                    failed += 1
+                    print(f"   ⚠️ 跳过 {filename}: {error}")
+                    continue
+                for name, recipe, tag, pcm in outputs:
+                    if writer and name in writer.names:
+                        continue
+                    if writer:
+                        writer.add(name, pcm, **variant_metadata(filename, recipe, tag))
+                    else:
+                        write_wav(os.path.join(args.output, name), pcm)
+                    produced += 1
+                    produced_samples += len(pcm) // 2
+    finally:
+        if writer:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    audio_seconds = produced_samples / SAMPLE_RATE
+    print(f"\n✅ 生成 {produced} 个变体，共 {audio_seconds / 3600:.2f} 小时音频，失败 {failed} 条")
+    print(f"   耗时 {elapsed:.1f}s，{produced / elapsed:.1f} 条/秒，{audio_seconds / elapsed:.0f}x 实时")
+
+
+if __name__ == "__main__":
+    main()
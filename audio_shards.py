@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+打包分片音频语料格式
+几十万个小 WAV 平铺在一个目录里时，os.listdir 和逐个打开文件在网络存储上非常慢。
+这里把音频打包进少量只追加写入的大分片文件，配合一个紧凑的索引：
+
+  corpus_dir/
+    index.tsv          每行一条: name  shard  offset  samples  label  text_id  voice  spd  pit  aug
+                       name 为“来源目录/文件名”；aug 为增强参数标签（见 audio_augment.py），原始音频留空
+    shard_00000.pcm    16 字节文件头 + 依次拼接的 16kHz int16 单声道 PCM
+    shard_00001.pcm    ...
+
+读取时对分片做内存映射，按索引切出 memoryview，帧数据零拷贝。
+用法:
+  python audio_shards.py convert generated_audio_baidu_验证码 -o corpus_验证码
+  python audio_shards.py info corpus_验证码
+"""
+
+import argparse
+import mmap
+import os
+import re
+import struct
+import wave
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SHARD_MAGIC = b"AFVSHRD1"
+SHARD_HEADER = struct.Struct("<8sII")  # magic, 采样率, 保留
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+INDEX_FILE = "index.tsv"
+INDEX_FIELDS = ["name", "shard", "offset", "samples", "label", "text_id", "voice", "spd", "pit", "aug"]
+LEGACY_FIELD_COUNT = 9  # 旧版索引没有 aug 列
+DEFAULT_SHARD_BYTES = 1 << 30  # 单个分片约 1GB
+
+# generated_audio.py 的文件名格式: {label}_{text_id}_voice{v}_spd{s}_pit{p}.wav
+GENERATED_NAME_RE = re.compile(r'^(?P<label>.+?)_(?P<text_id>[^_]+)_voice(?P<voice>\d+)_spd(?P<spd>\d+)_pit(?P<pit>\d+)')
+
+
+def is_shard_corpus(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, INDEX_FILE))
+
+
+def parse_clip_name(filename: str) -> Dict[str, str]:
+    """从生成器的文件名中解析标签和合成参数（忽略目录前缀），解析不到的字段留空"""
+    filename = os.path.basename(filename)
+    match = GENERATED_NAME_RE.match(filename)
+    if match:
+        return match.groupdict()
+    return {"label": "", "text_id": os.path.splitext(filename)[0], "voice": "", "spd": "", "pit": ""}
+
+
+def clip_name(source_dir: str, filename: str) -> str:
+    """语料中的条目名带上来源目录（按命令行给出的路径规范化），不同生成器目录里的同名文件（例如 slide_00.wav）不会互相覆盖"""
+    parts = os.path.normpath(source_dir).replace(os.sep, "/").split("/")
+    return "/".join([part for part in parts if part not in ("", ".", "..")] + [filename])
+
+
+def _shard_name(shard_id: int) -> str:
+    return f"shard_{shard_id:05d}.pcm"
+
+
+def _read_index(index_path: Path) -> Tuple[List[Dict], int]:
+    """
+    读取索引，返回 (条目列表, 有效部分的字节数)。
+    写到一半就崩溃时最后一行可能不完整（没有换行、字段数不对或数字无法解析），这样的行及其后内容被忽略。
+    """
+    entries: List[Dict] = []
+    with open(index_path, "rb") as f:
+        valid_size = len(f.readline())
+        for raw_line in f:
+            if not raw_line.endswith(b"\n"):
+                break
+            values = raw_line.decode("utf-8", errors="replace").rstrip("\n").split("\t")
+            if len(values) not in (len(INDEX_FIELDS), LEGACY_FIELD_COUNT):
+                break
+            entry = dict(zip(INDEX_FIELDS, values))
+            entry.setdefault("aug", "")
+            try:
+                entry["shard"], entry["offset"], entry["samples"] = int(values[1]), int(values[2]), int(values[3])
+            except ValueError:
+                break
+            entries.append(entry)
+            valid_size += len(raw_line)
+    return entries, valid_size
+
+
+class ShardWriter:
+    """只追加写入的分片写入器；对已有语料目录会接着最后一个分片继续写"""
+
+    def __init__(self, corpus_dir: str, shard_bytes: int = DEFAULT_SHARD_BYTES):
+        self.corpus_dir = Path(corpus_dir)
+        self.corpus_dir.mkdir(parents=True, exist_ok=True)
+        self.shard_bytes = shard_bytes
+        self.names = set()
+
+        index_path = self.corpus_dir / INDEX_FILE
+        shard_id = 0
+        if index_path.exists():
+            entries, valid_size = _read_index(index_path)
+            if valid_size < index_path.stat().st_size:
+                # 截掉崩溃时写了一半的索引行，新的条目从完整的行之后接着写
+                print(f"⚠️ 索引末尾存在不完整记录，已截断: {index_path}")
+                with open(index_path, "r+b") as f:
+                    f.truncate(valid_size)
+            for entry in entries:
+                self.names.add(entry["name"])
+                shard_id = max(shard_id, entry["shard"])
+            self._index = open(index_path, "a", encoding="utf-8")
+        else:
+            self._index = open(index_path, "w", encoding="utf-8")
+            self._index.write("\t".join(INDEX_FIELDS) + "\n")
+
+        self._shard_id = shard_id
+        self._shard = None
+        self._open_shard()
+
+    def _open_shard(self):
+        path = self.corpus_dir / _shard_name(self._shard_id)
+        is_new = not path.exists() or path.stat().st_size == 0
+        self._shard = open(path, "ab")
+        if is_new:
+            self._shard.write(SHARD_HEADER.pack(SHARD_MAGIC, SAMPLE_RATE, 0))
+            self._shard.flush()
+
+    def add(self, name: str, pcm: bytes, label: str = "", text_id: str = "", voice="", spd="", pit="", aug=""):
+        """追加一段 int16 PCM；先写数据再写索引，写到一半中断时索引不会指向不完整的数据"""
+        if self._shard.tell() + len(pcm) > self.shard_bytes and self._shard.tell() > SHARD_HEADER.size:
+            self._shard.close()
+            self._shard_id += 1
+            self._open_shard()
+
+        offset = self._shard.tell()
+        self._shard.write(pcm)
+        self._shard.flush()
+
+        fields = [name, self._shard_id, offset, len(pcm) // SAMPLE_WIDTH, label, text_id, voice, spd, pit, aug]
+        self._index.write("\t".join(str(field) for field in fields) + "\n")
+        self._index.flush()
+        self.names.add(name)
+
+    def close(self):
+        self._shard.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ShardReader:
+    """内存映射读取分片语料，返回零拷贝的 int16 memoryview"""
+
+    def __init__(self, corpus_dir: str):
+        self.corpus_dir = Path(corpus_dir)
+        # 只读取完整的索引行；崩溃留下的不完整末行由下一次 ShardWriter 打开时截掉
+        self.entries, _ = _read_index(self.corpus_dir / INDEX_FILE)
+        self._maps: Dict[int, mmap.mmap] = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _map(self, shard_id: int) -> mmap.mmap:
+        if shard_id not in self._maps:
+            with open(self.corpus_dir / _shard_name(shard_id), "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, sample_rate, _ = SHARD_HEADER.unpack_from(mm, 0)
+            if magic != SHARD_MAGIC:
+                raise ValueError(f"不是有效的分片文件: {_shard_name(shard_id)}")
+            if sample_rate != SAMPLE_RATE:
+                raise ValueError(f"分片采样率为 {sample_rate}，预期 {SAMPLE_RATE}")
+            self._maps[shard_id] = mm
+        return self._maps[shard_id]
+
+    def pcm(self, index: int) -> memoryview:
+        """第 index 条音频的 int16 采样（零拷贝 memoryview）"""
+        entry = self.entries[index]
+        start = entry["offset"]
+        return memoryview(self._map(entry["shard"]))[start:start + entry["samples"] * SAMPLE_WIDTH].cast("h")
+
+    def frames(self, index: int, frame_length: int) -> Iterator[memoryview]:
+        """按固定帧长切分（不足一帧的尾部丢弃），每帧都是零拷贝切片，可直接传给 Porcupine / Cobra"""
+        pcm = self.pcm(index)
+        for start in range(0, len(pcm) - frame_length + 1, frame_length):
+            yield pcm[start:start + frame_length]
+
+    def as_float32(self, index: int):
+        """转换为 Whisper 使用的 float32 波形（这一步需要拷贝）"""
+        import numpy as np
+        return np.frombuffer(self.pcm(index), dtype=np.int16).astype(np.float32) / 32768.0
+
+    def close(self):
+        for mm in self._maps.values():
+            try:
+                mm.close()
+            except BufferError:
+                # 仍有 memoryview 引用该映射时无法关闭，交给进程退出时回收
+                pass
+        self._maps = {}
+
+
+def read_wav_clip(filepath: str) -> Optional[bytes]:
+    """读取 16kHz 16-bit 单声道 WAV 的 PCM 数据，格式不符时返回 None"""
+    with wave.open(filepath, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != SAMPLE_WIDTH or wf.getframerate() != SAMPLE_RATE:
+            return None
+        return wf.readframes(wf.getnframes())
+
+
+def convert_directories(source_dirs: List[str], corpus_dir: str, shard_bytes: int = DEFAULT_SHARD_BYTES,
+                        label: Optional[str] = None):
+    """
+    把一个或多个 WAV 目录转换为分片语料，条目名为“来源目录/文件名”（见 clip_name）。
+    可重复运行：之前已转换的条目会跳过；本次转换中条目名重复（同一目录被重复指定）的文件不写入并单独报告。
+    """
+    converted, skipped, existing, duplicates = 0, 0, 0, 0
+    names_this_run = set()
+    with ShardWriter(corpus_dir, shard_bytes) as writer:
+        for source_dir in source_dirs:
+            if not os.path.isdir(source_dir):
+                print(f"⚠️ 文件夹不存在: {source_dir}")
+                continue
+            print(f"📁 正在转换目录: {source_dir}")
+            for filename in sorted(os.listdir(source_dir)):
+                if not filename.lower().endswith(".wav"):
+                    continue
+                name = clip_name(source_dir, filename)
+                if name in names_this_run:
+                    duplicates += 1
+                    print(f"   ⚠️ 条目名重复，跳过 {os.path.join(source_dir, filename)}: 本次已写入 {name}")
+                    continue
+                names_this_run.add(name)
+                if name in writer.names:
+                    existing += 1
+                    continue
+                try:
+                    pcm = read_wav_clip(os.path.join(source_dir, filename))
+                except (wave.Error, EOFError) as e:
+                    pcm = None
+                    print(f"   ⚠️ 无法读取 {filename}: {e}")
+                if pcm is None:
+                    skipped += 1
+                    print(f"   ⚠️ 跳过 {filename}: 需要 {SAMPLE_RATE}Hz 16-bit 单声道 WAV")
+                    continue
+
+                meta = parse_clip_name(filename)
+                if label is not None:
+                    meta["label"] = label
+                writer.add(name, pcm, **meta)
+                converted += 1
+
+    print(f"✅ 转换完成: {converted} 个文件写入 {corpus_dir}，已存在 {existing} 个，"
+          f"格式不符跳过 {skipped} 个，条目名重复 {duplicates} 个")
+
+
+def print_corpus_info(corpus_dir: str):
+    reader = ShardReader(corpus_dir)
+    total_samples = sum(entry["samples"] for entry in reader.entries)
+    shards = sorted({entry["shard"] for entry in reader.entries})
+    labels = {}
+    for entry in reader.entries:
+        labels[entry["label"]] = labels.get(entry["label"], 0) + 1
+
+    print(f"📦 语料目录: {corpus_dir}")
+    print(f"   音频条数: {len(reader)}")
+    print(f"   分片数: {len(shards)}")
+    print(f"   总时长: {total_samples / SAMPLE_RATE / 3600:.2f} 小时")
+    for name, count in sorted(labels.items()):
+        print(f"   标签 '{name or '(空)'}': {count} 条")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='打包分片音频语料：转换与查看')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help='把 WAV 目录转换为分片语料')
+    convert_parser.add_argument('source_dirs', nargs='+', help='WAV 目录（可多个）')
+    convert_parser.add_argument('-o', '--output', required=True, help='分片语料输出目录')
+    convert_parser.add_argument('--shard-mb', type=int, default=DEFAULT_SHARD_BYTES >> 20, help='单个分片大小上限，MB (默认: 1024)')
+    convert_parser.add_argument('--label', default=None, help='统一指定标签（默认从文件名解析）')
+
+    info_parser = subparsers.add_parser('info', help='查看分片语料信息')
+    info_parser.add_argument('corpus_dir', help='分片语料目录')
+
+    args = parser.parse_args()
+    if args.command == 'convert':
+        convert_directories(args.source_dirs, args.output, args.shard_mb << 20, args.label)
+    else:
+        print_corpus_info(args.corpus_dir)
+
+
+if __name__ == "__main__":
+    main()
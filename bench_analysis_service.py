@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分析服务压测脚本
+在本进程内启动 analysis_service（使用本地替身模型），以不同并发度发送上传请求，
+统计吞吐量、p50/p99 延迟和 429 拒绝数。
+也可用 --url 对已启动的服务进行压测。
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import time
+import wave
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from analysis_service import AnalysisService, make_standin_backends
+
+
+def make_silent_wav(seconds: float = 20, sample_rate: int = 16000) -> bytes:
+    """生成一段静音 WAV 作为上传内容（时长与语料中的来电相当）"""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buf.getvalue()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+async def post_audio(host: str, port: int, audio_bytes: bytes, filename: str):
+    """发送一次 POST /analyze，返回 (状态码, 响应 JSON)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(
+        f"POST /analyze?filename={filename} HTTP/1.1\r\n"
+        f"Host: {host}:{port}\r\n"
+        f"Content-Type: application/octet-stream\r\n"
+        f"Content-Length: {len(audio_bytes)}\r\n"
+        f"Connection: close\r\n\r\n".encode("latin-1") + audio_bytes
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, json.loads(body.decode("utf-8")) if body else None
+
+
+async def run_level(host: str, port: int, audio_bytes: bytes, concurrency: int, total_requests: int):
+    """以固定并发度发送 total_requests 个请求"""
+    latencies, rejected, failed = [], 0, 0
+    counter = iter(range(total_requests))
+
+    async def worker():
+        nonlocal rejected, failed
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                status, _ = await post_audio(host, port, audio_bytes, f"bench_{i:05d}.wav")
+            except (ConnectionError, OSError):
+                failed += 1
+                continue
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            elif status == 429:
+                rejected += 1
+            else:
+                failed += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return latencies, rejected, failed, elapsed
+
+
+async def run_benchmark(args):
+    audio_bytes = make_silent_wav(args.clip_seconds)
+    service: Optional[AnalysisService] = None
+    server = None
+
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+        print(f"🎯 压测已有服务: {args.url}")
+    else:
+        host, port = "127.0.0.1", args.port
+        transcribe_batch, analyze_text = make_standin_backends(args.asr_fixed_ms, args.asr_per_clip_ms, args.llm_ms)
+        service = AnalysisService(
+            transcribe_batch, analyze_text,
+            max_batch_size=args.batch_size, max_batch_wait=args.batch_wait_ms / 1000,
+            max_queue=args.max_queue, llm_concurrency=args.llm_concurrency
+        )
+        server = await service.serve(host, port)
+        print(f"🧪 本地替身服务: ASR {args.asr_fixed_ms}ms + {args.asr_per_clip_ms}ms/条, LLM {args.llm_ms}ms, "
+              f"批大小 {args.batch_size}, 等待窗口 {args.batch_wait_ms}ms")
+
+    print("=" * 80)
+    print(f"{'并发':>6} {'请求数':>8} {'吞吐(req/s)':>12} {'p50(ms)':>10} {'p99(ms)':>10} {'429':>6} {'失败':>6} {'平均批大小':>10}")
+    print("-" * 80)
+    try:
+        for concurrency in args.concurrency:
+            total_requests = max(args.requests, concurrency)
+            if service:
+                service.batch_sizes.clear()
+            latencies, rejected, failed, elapsed = await run_level(host, port, audio_bytes, concurrency, total_requests)
+            throughput = len(latencies) / elapsed if elapsed > 0 else 0
+            avg_batch = service.health()["avg_batch_size"] if service else float("nan")
+            print(f"{concurrency:>6} {total_requests:>8} {throughput:>12.2f} "
+                  f"{percentile(latencies, 50) * 1000:>10.1f} {percentile(latencies, 99) * 1000:>10.1f} "
+                  f"{rejected:>6} {failed:>6} {avg_batch:>10.2f}")
+    finally:
+        if server:
+            server.close()
+            await server.wait_closed()
+            await service.stop()
+    print("=" * 80)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='反诈骗语音分析服务压测')
+    parser.add_argument('--url', default=None, help='压测已启动的服务，例如 http://127.0.0.1:8000 (默认: 进程内启动替身服务)')
+    parser.add_argument('--port', type=int, default=8765, help='进程内替身服务端口 (默认: 8765)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64], help='并发度列表 (默认: 1 4 16 64)')
+    parser.add_argument('--requests', type=int, default=64, help='每个并发度发送的请求数 (默认: 64)')
+    parser.add_argument('--clip-seconds', type=float, default=20, help='上传音频时长，秒 (默认: 20)')
+    parser.add_argument('--batch-size', type=int, default=8, help='ASR 微批次最大条数 (默认: 8)')
+    parser.add_argument('--batch-wait-ms', type=float, default=50, help='ASR 微批次等待窗口，毫秒 (默认: 50)')
+    parser.add_argument('--max-queue', type=int, default=64, help='ASR 等待队列上限 (默认: 64)')
+    parser.add_argument('--llm-concurrency', type=int, default=16, help='LLM 并发调用数 (默认: 16)')
+    parser.add_argument('--asr-fixed-ms', type=float, default=200, help='替身 ASR 每批固定耗时 (默认: 200)')
+    parser.add_argument('--asr-per-clip-ms', type=float, default=50, help='替身 ASR 每条耗时 (默认: 50)')
+    parser.add_argument('--llm-ms', type=float, default=800, help='替身 LLM 每次调用耗时 (默认: 800)')
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
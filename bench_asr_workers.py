@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多进程 ASR 内存与启动时间基准
+分别以“共享权重（加载一次后 fork）”和“每进程独立加载”两种方式启动 1 / 4 / 16 个工作进程，
+统计所有进程的 RSS 总和、PSS 总和（真实内存占用）、首条结果耗时和总耗时。
+"""
+
+import argparse
+import os
+import time
+
+from asr_workers import AsrWorkerPool
+
+
+def run_once(model_name: str, num_workers: int, share_weights: bool, audio_paths):
+    pool = AsrWorkerPool(model_name, num_workers=num_workers, share_weights=share_weights)
+    first_result_at = []
+    start = time.perf_counter()
+    pool.start()
+    try:
+        texts = pool.transcribe(audio_paths, on_first_result=lambda: first_result_at.append(time.perf_counter()))
+        elapsed = time.perf_counter() - start
+        # 所有工作进程都已完成推理、分配过中间结果后再统计内存
+        memory = pool.memory_usage()
+    finally:
+        pool.close()
+
+    errors = sum(1 for t in texts if t is None or t.startswith("Error:"))
+    return {
+        "time_to_first": first_result_at[0] - start if first_result_at else float("nan"),
+        "elapsed": elapsed,
+        "rss": memory["rss"],
+        "pss": memory["pss"],
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多进程 ASR：共享权重 vs 独立加载')
+    parser.add_argument('audio_dir', nargs='?', default='call_cases2', help='音频目录 (默认: call_cases2)')
+    parser.add_argument('--model', default='base', help='Whisper 模型 (默认: base)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16], help='工作进程数列表 (默认: 1 4 16)')
+    parser.add_argument('--files-per-worker', type=int, default=2, help='每个工作进程分到的音频数 (默认: 2)')
+    args = parser.parse_args()
+
+    supported_formats = ('.wav', '.mp3', '.m4a', '.flac', '.ogg')
+    all_files = sorted(
+        os.path.join(args.audio_dir, f) for f in os.listdir(args.audio_dir) if f.lower().endswith(supported_formats)
+    )
+    if not all_files:
+        print(f"在文件夹 '{args.audio_dir}' 中没有找到支持的音频文件。")
+        return
+
+    print("=" * 88)
+    print(f"{'进程数':>6} {'方式':<10} {'RSS总和(MB)':>12} {'PSS总和(MB)':>12} {'首条结果(s)':>12} {'总耗时(s)':>10} {'失败':>6}")
+    print("-" * 88)
+    for num_workers in args.workers:
+        count = num_workers * args.files_per_worker
+        audio_paths = (all_files * (count // len(all_files) + 1))[:count]
+        for share_weights in (True, False):
+            stats = run_once(args.model, num_workers, share_weights, audio_paths)
+            mode = "共享权重" if share_weights else "独立加载"
+            print(f"{num_workers:>6} {mode:<10} {stats['rss'] / 2**20:>12.0f} {stats['pss'] / 2**20:>12.0f} "
+                  f"{stats['time_to_first']:>12.2f} {stats['elapsed']:>10.2f} {stats['errors']:>6}")
+    print("=" * 88)
+    print("注: RSS 会把共享页面在每个进程里重复计算，PSS 按共享进程数均摊，更接近真实总内存。")
+
+
+if __name__ == "__main__":
+    main()
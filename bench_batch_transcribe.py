@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量转录 CPU 吞吐基准
+对比逐文件调用 model.transcribe 与 batch_transcriber.transcribe_batch 在不同批大小下的吞吐，
+并统计两种方式转录文本的一致程度。
+"""
+
+import argparse
+import difflib
+import os
+import time
+
+import torch
+import whisper
+
+from batch_transcriber import PROMPT, transcribe_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Whisper 批量转录 CPU 吞吐基准')
+    parser.add_argument('audio_dir', nargs='?', default='call_cases2', help='音频目录 (默认: call_cases2)')
+    parser.add_argument('--model', default='base', help='Whisper 模型 (默认: base)')
+    parser.add_argument('--limit', type=int, default=32, help='最多使用的音频数 (默认: 32)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16], help='批大小列表 (默认: 1 4 8 16)')
+    parser.add_argument('--threads', type=int, default=None, help='torch CPU 线程数 (默认: torch 自动设置)')
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    supported_formats = ('.wav', '.mp3', '.m4a', '.flac', '.ogg')
+    audio_paths = sorted(
+        os.path.join(args.audio_dir, f) for f in os.listdir(args.audio_dir) if f.lower().endswith(supported_formats)
+    )[:args.limit]
+    if not audio_paths:
+        print(f"在文件夹 '{args.audio_dir}' 中没有找到支持的音频文件。")
+        return
+
+    total_audio_seconds = sum(len(whisper.load_audio(p)) for p in audio_paths) / whisper.audio.SAMPLE_RATE
+    print(f"Loading Whisper '{args.model}' on CPU, {torch.get_num_threads()} threads...")
+    model = whisper.load_model(args.model, device="cpu")
+    print(f"音频数: {len(audio_paths)}, 总时长: {total_audio_seconds:.1f} 秒\n")
+
+    # --- 基线：逐文件转录（与 deepseek_analyzer 原流程一致） ---
+    start = time.perf_counter()
+    baseline_texts = [
+        model.transcribe(p, language="zh", fp16=False, initial_prompt=PROMPT)['text'].strip() for p in audio_paths
+    ]
+    baseline_elapsed = time.perf_counter() - start
+
+    print("=" * 80)
+    print(f"{'方式':<16} {'耗时(s)':>10} {'条/秒':>10} {'实时倍数':>10} {'加速比':>8} {'文本一致率':>10} {'字符相似度':>10}")
+    print("-" * 80)
+    print(f"{'逐文件 transcribe':<16} {baseline_elapsed:>10.2f} {len(audio_paths) / baseline_elapsed:>10.2f} "
+          f"{total_audio_seconds / baseline_elapsed:>10.1f} {1.0:>8.2f} {'-':>10} {'-':>10}")
+
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        texts = transcribe_batch(model, audio_paths, batch_size=batch_size, fp16=False)
+        elapsed = time.perf_counter() - start
+
+        exact = sum(a == b for a, b in zip(texts, baseline_texts)) / len(texts)
+        similarity = sum(difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(texts, baseline_texts)) / len(texts)
+        print(f"{f'批量 batch={batch_size}':<16} {elapsed:>10.2f} {len(audio_paths) / elapsed:>10.2f} "
+              f"{total_audio_seconds / elapsed:>10.1f} {baseline_elapsed / elapsed:>8.2f} {exact:>10.1%} {similarity:>10.1%}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流式判定耗时基准
+在本地启动一个模拟 OpenAI 兼容接口的假服务（按设定的首字延迟和生成速度逐 token 输出一份固定的分析 JSON），
+分别用普通调用和流式调用请求，对比“拿到 is_scam / risk_level 的耗时”和“拿到完整结果的耗时”。
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+
+from llm_stream import start_streaming_analysis
+
+FAKE_ANALYSIS = {
+    "legitimacy_checks": {
+        "official_channel_guidance": False,
+        "harmless_action_statement": False,
+        "is_information_sync": False
+    },
+    "final_assessment": {
+        "is_scam": True,
+        "risk_level": "高风险",
+        "scam_type": "冒充公检法",
+        "reasoning": "该讲话文本自称最高人民检察院金融犯罪专案组，声称用户账户涉嫌偷逃税款，并要求用户在24小时内配合线上身份核实。"
+                     "文本没有引导用户通过官方App、官网或线下网点办理，也没有声明本次通话不涉及任何费用或转账，"
+                     "内容并非单纯的信息同步，而是以法律风险施压、制造紧迫感，诱导用户进行线上操作。"
+                     "三项合法性检查均为false，同时具备冒充公检法诈骗的典型特征，因此判定为高风险诈骗。"
+    }
+}
+
+MESSAGES = [{"role": "system", "content": "benchmark"}, {"role": "user", "content": "benchmark"}]
+
+
+def tokenize(text: str, chars_per_token: int = 2):
+    return [text[i:i + chars_per_token] for i in range(0, len(text), chars_per_token)]
+
+
+def make_handler(first_token_delay: float, tokens_per_second: float):
+    content = json.dumps(FAKE_ANALYSIS, ensure_ascii=False, indent=2)
+    tokens = tokenize(content)
+
+    class FakeCompletionHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": request.get("model", "fake")}
+            time.sleep(first_token_delay)
+
+            if not request.get("stream"):
+                time.sleep(len(tokens) / tokens_per_second)
+                body = json.dumps(dict(base, object="chat.completion", choices=[{
+                    "index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}
+                }], usage={"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)}),
+                    ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for token in tokens:
+                chunk = dict(base, object="chat.completion.chunk", choices=[{
+                    "index": 0, "finish_reason": None, "delta": {"content": token}
+                }])
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(1 / tokens_per_second)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return FakeCompletionHandler, len(tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LLM 流式判定 vs 完整响应：耗时对比（本地假接口）')
+    parser.add_argument('--port', type=int, default=8766, help='假接口端口 (默认: 8766)')
+    parser.add_argument('--first-token-ms', type=float, default=300, help='首 token 延迟，毫秒 (默认: 300)')
+    parser.add_argument('--tokens-per-second', type=float, default=60, help='生成速度，token/秒 (默认: 60)')
+    parser.add_argument('--runs', type=int, default=5, help='每种方式的请求次数 (默认: 5)')
+    args = parser.parse_args()
+
+    handler, num_tokens = make_handler(args.first_token_ms / 1000, args.tokens_per_second)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = openai.OpenAI(api_key="sk-fake", base_url=f"http://127.0.0.1:{args.port}/v1")
+    print(f"🧪 假接口: 首 token {args.first_token_ms:.0f}ms, {args.tokens_per_second:.0f} token/s, 响应共 {num_tokens} token")
+
+    blocking, verdicts, completes = [], [], []
+    try:
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            response = client.chat.completions.create(
+                model="fake", messages=MESSAGES, response_format={"type": "json_object"}, temperature=0.0
+            )
+            json.loads(response.choices[0].message.content)
+            blocking.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            streaming = start_streaming_analysis(client, MESSAGES, "fake")
+            verdict = streaming.wait_verdict()
+            verdicts.append(time.perf_counter() - start)
+            result = streaming.result()
+            completes.append(time.perf_counter() - start)
+            assert verdict == {"is_scam": True, "risk_level": "高风险"} and result == FAKE_ANALYSIS
+    finally:
+        server.shutdown()
+
+    median_blocking, median_verdict = statistics.median(blocking), statistics.median(verdicts)
+    print("=" * 60)
+    print(f"{'方式':<24} {'中位耗时(ms)':>14}")
+    print("-" * 60)
+    print(f"{'普通调用 (完整 JSON)':<24} {median_blocking * 1000:>14.0f}")
+    print(f"{'流式调用 -> 判定':<24} {median_verdict * 1000:>14.0f}")
+    print(f"{'流式调用 -> 完整结果':<24} {statistics.median(completes) * 1000:>14.0f}")
+    print("-" * 60)
+    print(f"判定提前 {(median_blocking - median_verdict) * 1000:.0f}ms ({median_blocking / median_verdict:.1f}x)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+近重复判定复用评估
+在不同相似度阈值下统计复用率和误复用率，不产生新的 LLM 调用：
+  - --store: 使用 deepseek_analyzer 写出的结果文件，以每条记录真实的 LLM 判定为准，
+             复用的判定与真实判定（is_scam / risk_level）不一致即计为误复用
+  - 默认:    使用仓库中的模拟来电文本语料，以语料类别（诈骗 / 正常）为准
+"""
+
+import argparse
+import json
+import re
+from typing import Dict, List, Tuple
+
+from near_duplicate import VerdictCache
+
+# 语料文件 -> 是否为诈骗
+DEFAULT_CORPORA = {
+    "模拟公检法来电文本_200条.md": True,
+    "模拟贷款代办信用卡来电文本_200条.md": True,
+    "模拟客服.md": False,
+}
+
+
+def load_corpus_samples(corpora: Dict[str, bool]) -> List[Tuple[str, Dict]]:
+    """从 Slidev 格式语料中提取讲话文本（HTML 注释内容，去掉预计时长），并按类别构造判定"""
+    samples = []
+    for md_file, is_scam in corpora.items():
+        with open(md_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        for comment in re.findall(r'<!--\s*(.*?)\s*-->', content, re.DOTALL):
+            script = re.sub(r'预计时长[：:]\s*\d+秒', '', comment).strip()
+            if script:
+                verdict = {"final_assessment": {"is_scam": is_scam, "risk_level": "高风险" if is_scam else "无风险"}}
+                samples.append((script, verdict))
+    return samples
+
+
+def load_store_samples(store_path: str) -> List[Tuple[str, Dict]]:
+    """从结果文件中读取转录文本和真实 LLM 判定（跳过失败和本身就是复用得到的记录）"""
+    samples = []
+    with open(store_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            res = json.loads(line)
+            analysis = res.get("llm_analysis")
+            if res.get("transcription") and analysis and "error" not in analysis and "reused_from" not in analysis:
+                samples.append((res["transcription"], analysis))
+    return samples
+
+
+def verdict_key(verdict: Dict):
+    assessment = verdict.get("final_assessment", {})
+    return assessment.get("is_scam"), assessment.get("risk_level")
+
+
+def evaluate(samples: List[Tuple[str, Dict]], threshold: float, num_perm: int, bands: int, shingle_size: int):
+    truth = {}
+
+    def oracle(text: str) -> Dict:
+        return truth[text]
+
+    cache = VerdictCache(oracle, threshold, num_perm=num_perm, bands=bands, shingle_size=shingle_size)
+    false_reuse = 0
+    for text, verdict in samples:
+        truth[text] = verdict
+        result = cache.analyze(text)
+        if "reused_from" in result and verdict_key(result) != verdict_key(verdict):
+            false_reuse += 1
+    return cache, false_reuse
+
+
+def main():
+    parser = argparse.ArgumentParser(description='近重复判定复用：复用率 / 误复用率评估')
+    parser.add_argument('--store', default=None, help='deepseek_analyzer 的结果文件 (默认: 使用模拟来电文本语料)')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.5, 0.6, 0.7, 0.8, 0.9],
+                        help='相似度阈值列表 (默认: 0.5 0.6 0.7 0.8 0.9)')
+    parser.add_argument('--num-perm', type=int, default=128, help='MinHash 签名长度 (默认: 128)')
+    parser.add_argument('--bands', type=int, default=32, help='LSH 分段数 (默认: 32)')
+    parser.add_argument('--shingle-size', type=int, default=3, help='字符片段长度 (默认: 3)')
+    args = parser.parse_args()
+
+    samples = load_store_samples(args.store) if args.store else load_corpus_samples(DEFAULT_CORPORA)
+    print(f"样本数: {len(samples)} ({'结果文件: ' + args.store if args.store else '模拟来电文本语料'})")
+
+    print("=" * 72)
+    print(f"{'阈值':>6} {'LLM调用':>8} {'复用':>6} {'复用率':>8} {'误复用':>6} {'误复用率':>8} {'关键词拦截':>10}")
+    print("-" * 72)
+    for threshold in args.thresholds:
+        cache, false_reuse = evaluate(samples, threshold, args.num_perm, args.bands, args.shingle_size)
+        false_rate = false_reuse / cache.reused if cache.reused else 0.0
+        print(f"{threshold:>6.2f} {cache.lookups - cache.reused:>8} {cache.reused:>6} {cache.reuse_rate:>8.1%} "
+              f"{false_reuse:>6} {false_rate:>8.1%} {cache.keyword_rejections:>10}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
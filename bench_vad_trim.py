@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+VAD 静音裁剪效果评估
+对目录中的每个 WAV 文件分别转录原始音频和裁剪后的语音，统计：
+  - 节省的音频秒数和 ASR 耗时
+  - 转录准确率变化：提供 --csv（generated_audio.py 使用的文本 CSV）时计算相对原文的字错率 (CER)，
+    否则计算裁剪前后两份转录之间的差异
+"""
+
+import argparse
+import csv
+import os
+import re
+import time
+
+import pvcobra
+import whisper
+
+from batch_transcriber import transcribe_batch
+from vad_trimmer import trim_silence
+
+
+def char_error_rate(reference: str, hypothesis: str) -> float:
+    """字错率 = 编辑距离 / 参考文本长度（忽略标点和空白）"""
+    strip = lambda s: re.sub(r'[\s，。、！？,.!?；;：:“”"]', '', s)
+    ref, hyp = strip(reference), strip(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, rc in enumerate(ref, 1):
+        current = [i]
+        for j, hc in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (rc != hc)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_reference_texts(csv_path: str) -> dict:
+    """读取 generated_audio.py 的输入 CSV，返回 {id: text}"""
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        return {str(row['id']): row['text'] for row in csv.DictReader(f)}
+
+
+def reference_id_from_filename(filename: str):
+    """generated_audio.py 生成的文件名格式: {label}_{id}_voice{v}_spd{s}_pit{p}.wav"""
+    match = re.match(r'^.+?_(?P<id>[^_]+)_voice\d+', filename)
+    return match.group('id') if match else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='VAD 静音裁剪对转录耗时和准确率的影响')
+    parser.add_argument('audio_dir', nargs='?', default='generated_audio_baidu_验证码', help='WAV 目录')
+    parser.add_argument('--access-key', default='wnNixNAHoeM9gS9YpmUqTuchNvkY64zXHxxMeQ3haqrU0fGPEsNvmQ==',
+                        help='Picovoice AccessKey (默认: test_kws2.py 中的测试 Key)')
+    parser.add_argument('--csv', default=None, help='参考文本 CSV（id,text,label），用于计算字错率')
+    parser.add_argument('--model', default='base', help='Whisper 模型 (默认: base)')
+    parser.add_argument('--vad-threshold', type=float, default=0.2, help='语音概率阈值 (默认: 0.2)')
+    parser.add_argument('--padding-ms', type=int, default=200, help='语音片段前后保留的余量，毫秒 (默认: 200)')
+    parser.add_argument('--merge-gap-ms', type=int, default=300, help='合并相邻片段的最大间隔，毫秒 (默认: 300)')
+    parser.add_argument('--limit', type=int, default=50, help='最多评估的文件数 (默认: 50)')
+    args = parser.parse_args()
+
+    wav_files = sorted(f for f in os.listdir(args.audio_dir) if f.lower().endswith('.wav'))[:args.limit]
+    if not wav_files:
+        print(f"在文件夹 '{args.audio_dir}' 中没有找到 WAV 文件。")
+        return
+
+    references = load_reference_texts(args.csv) if args.csv else {}
+    model = whisper.load_model(args.model)
+    cobra = pvcobra.create(access_key=args.access_key)
+
+    original_seconds = speech_seconds = 0.0
+    full_asr_time = trimmed_asr_time = vad_time = 0.0
+    full_cer, trimmed_cer, drift, scored, evaluated = 0.0, 0.0, 0.0, 0, 0
+
+    try:
+        for filename in wav_files:
+            filepath = os.path.join(args.audio_dir, filename)
+
+            start = time.perf_counter()
+            try:
+                trimmed = trim_silence(filepath, cobra, args.vad_threshold, args.padding_ms, args.merge_gap_ms)
+            except ValueError as e:
+                print(f"⚠️ 跳过 {filename}: {e}")
+                continue
+            vad_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            full_text = transcribe_batch(model, [filepath])[0]
+            full_asr_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            trimmed_text = transcribe_batch(model, [trimmed["audio"]])[0]
+            trimmed_asr_time += time.perf_counter() - start
+
+            evaluated += 1
+            original_seconds += trimmed["original_seconds"]
+            speech_seconds += trimmed["speech_seconds"]
+            drift += char_error_rate(full_text, trimmed_text)
+
+            reference = references.get(reference_id_from_filename(filename))
+            if reference:
+                full_cer += char_error_rate(reference, full_text)
+                trimmed_cer += char_error_rate(reference, trimmed_text)
+                scored += 1
+
+            print(f"🎧 {filename}: {trimmed['original_seconds']:.1f}s -> {trimmed['speech_seconds']:.1f}s, "
+                  f"{len(trimmed['segments'])} 段")
+            if full_text != trimmed_text:
+                print(f"   原始: {full_text}\n   裁剪: {trimmed_text}")
+    finally:
+        cobra.delete()
+
+    if not evaluated:
+        print("没有可评估的文件。")
+        return
+
+    saved = original_seconds - speech_seconds
+    print("\n" + "=" * 60)
+    print(f"📊 VAD 裁剪评估 ({evaluated} 个文件)")
+    print(f"   音频总时长: {original_seconds:.1f}s -> {speech_seconds:.1f}s，节省 {saved:.1f}s "
+          f"({saved / original_seconds:.1%})" if original_seconds else "   音频总时长: 0s")
+    print(f"   ASR 耗时: {full_asr_time:.1f}s -> {trimmed_asr_time:.1f}s (VAD 额外耗时 {vad_time:.1f}s)")
+    print(f"   裁剪前后转录差异 (以原始转录为参考的 CER): {drift / evaluated:.2%}")
+    if scored:
+        print(f"   相对原文 CER: 原始 {full_cer / scored:.2%} -> 裁剪 {trimmed_cer / scored:.2%} ({scored} 个有参考文本)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
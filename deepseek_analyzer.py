@@ -4,6 +4,13 @@ import os
 import time
 import openai
 import json
+import numpy as np
+from audio_shards import ShardReader, is_shard_corpus
+from batch_transcriber import PROMPT, transcribe_batch
+from llm_stream import start_streaming_analysis
+from near_duplicate import VerdictCache
+from vad_trimmer import compute_voice_probabilities, trim_pcm, trim_silence
+from result_store import ResultStore, classify_risk, print_scam_summary_report, calculate_performance_metrics
 
 # --- 1. 初始化模型和客户端 ---
 # (这部分代码保持不变，假设您已经填入了有效的API Key和配置)
@@ -35,15 +42,10 @@ except Exception as e:
 
 # --- 2. 定义分析函数 ---
 
-PROMPT = "这是一段可能包含金融、转账、汇款、验证码、银行、账户等词语的对话。"
-
-def analyze_scam_with_llm(text_to_analyze: str, model_name="deepseek-chat"):
+def build_llm_messages(text_to_analyze: str):
     """
-    使用LLM进行深度分析，引入“合法性检查点”以降低误报率。
+    构造LLM分析请求的消息列表（普通调用与流式调用共用同一套Prompt）。
     """
-    if not client:
-        return {"error": "LLM client not available."}
-
     # 【核心升级】引入“合法性检查点”的全新System Prompt
     system_prompt = """
     你是一个极其严谨、注重逻辑的“对话定性分析师”，专攻反诈骗领域。误报一个正常通话是对用户的严重骚扰，必须极力避免。
@@ -88,11 +90,20 @@ def analyze_scam_with_llm(text_to_analyze: str, model_name="deepseek-chat"):
     
     # 【核心升级】新的User Prompt
     user_prompt = f"请严格遵循你被设定的“对话定性分析师”角色和分析框架，对以下讲话文本进行【合法性检查】和最终评估，并严格按照要求的JSON格式返回结果。\n\n--- 讲话文本 ---\n\"{text_to_analyze}\"\n--- 结束 ---"
-    
+
+    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
+
+def analyze_scam_with_llm(text_to_analyze: str, model_name="deepseek-chat"):
+    """
+    使用LLM进行深度分析，引入“合法性检查点”以降低误报率。
+    """
+    if not client:
+        return {"error": "LLM client not available."}
+
     try:
         response = client.chat.completions.create(
             model=model_name,
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
+            messages=build_llm_messages(text_to_analyze),
             response_format={"type": "json_object"}, 
             temperature=0.0 # 对于分类和结构化输出，使用0温度以获得最稳定、可复现的结果
         )
@@ -101,26 +112,47 @@ def analyze_scam_with_llm(text_to_analyze: str, model_name="deepseek-chat"):
         print(f"   [LLM ERROR] LLM API call failed: {e}")
         return {"error": str(e)}
 
-def analyze_audio_for_scam(audio_path):
+def analyze_scam_with_llm_stream(text_to_analyze: str, model_name="deepseek-chat"):
+    """
+    流式版本的LLM分析：立即返回 StreamingVerdict。
+    预警路径调用 wait_verdict() 即可在 is_scam / risk_level 生成后马上拿到判定，
+    需要完整结果（含 reasoning）时调用 result()。客户端不可用或请求失败时返回 None。
+    """
+    if not client:
+        return None
+    try:
+        return start_streaming_analysis(client, build_llm_messages(text_to_analyze), model_name)
+    except Exception as e:
+        print(f"   [LLM ERROR] LLM API call failed: {e}")
+        return None
+
+def analyze_audio_for_scam(audio_path, transcribed_text=None, analyze_text=analyze_scam_with_llm, audio=None):
+    """
+    转录并分析单个音频文件。已经批量转录过的文件可通过 transcribed_text 传入文本，跳过 ASR。
+    analyze_text 可替换为 VerdictCache.analyze，以复用近重复文本的判定。
+    audio 为已读入内存的 float32 波形（例如来自分片语料），此时 audio_path 只用作文件名。
+    """
     print(f"-> Processing: {os.path.basename(audio_path)}...")
     result = {"filename": os.path.basename(audio_path), "transcription": "", "llm_analysis": None}
     try:
-        transcription_result = asr_model.transcribe(
-            audio_path, language="zh", fp16=torch.cuda.is_available(), initial_prompt=PROMPT
-        )
-        transcribed_text = transcription_result['text'].strip()
+        if transcribed_text is None:
+            transcription_result = asr_model.transcribe(
+                audio_path if audio is None else audio, language="zh", fp16=torch.cuda.is_available(), initial_prompt=PROMPT
+            )
+            transcribed_text = transcription_result['text'].strip()
         result["transcription"] = transcribed_text
         if transcribed_text:
             print(f"   Transcript: \"{transcribed_text}\"")
             if client:
                 print("   -> Sending to LLM for advanced analysis...")
-                llm_analysis_result = analyze_scam_with_llm(transcribed_text)
+                llm_analysis_result = analyze_text(transcribed_text)
                 result["llm_analysis"] = llm_analysis_result
                 if llm_analysis_result and "error" not in llm_analysis_result:
                     assessment = llm_analysis_result.get("final_assessment", {})
                     risk = assessment.get('risk_level', '未知')
                     scam_type = assessment.get('scam_type', '未知')
-                    print(f"   [LLM Result] Risk Level: {risk}, Scam Type: {scam_type}")
+                    reused = " (复用近重复文本的判定)" if "reused_from" in llm_analysis_result else ""
+                    print(f"   [LLM Result] Risk Level: {risk}, Scam Type: {scam_type}{reused}")
                 else:
                     print("   [LLM Result] Analysis failed or returned an error.")
             else:
@@ -132,98 +164,48 @@ def analyze_audio_for_scam(audio_path):
         result["transcription"] = f"Error: {e}"
     return result
 
-# --- 【核心升级】全新的总结报告函数，能展示合法性检查结果 ---
-def print_scam_summary_report(all_results):
+def analyze_audio_batch_for_scam(audio_paths, batch_size=8, analyze_text=analyze_scam_with_llm, audios=None):
     """
-    生成一份详细的总结报告，包含合法性检查结果，以分析误报原因。
+    批量转录一组音频后逐条进行 LLM 分析，结果按输入顺序返回。
+    audios 为与 audio_paths 一一对应的内存波形（可选），提供时直接转录波形而不读取文件。
+    批量转录失败（例如某个文件无法读取）时回退到逐条处理，由单条流程记录具体错误。
     """
-    risk_categories = {"高风险": [], "中风险": [], "低风险": [], "无风险": [], "分析失败": []}
-    
-    for res in all_results:
-        analysis = res.get("llm_analysis")
-        if res["transcription"].startswith("Error:") or not analysis or "error" in analysis:
-            risk_categories["分析失败"].append(res)
-        else:
-            risk_level = analysis.get("final_assessment", {}).get("risk_level", "分析失败")
-            risk_categories.get(risk_level, risk_categories["分析失败"]).append(res)
-
-    print("\n" + "="*80)
-    print("           🚨  LLM 反诈骗智能分析总结报告 (V2 - 逻辑增强版)  🚨")
-    print("="*80)
-    print(f"总共分析了 {len(all_results)} 个音频文件。\n")
-
-    for risk, files in risk_categories.items():
-        if not files:
-            continue
-        
-        icon = {"高风险": "🔥🔥🔥", "中风险": "⚠️", "低风险": "➡️", "无风险": "✅", "分析失败": "❌"}.get(risk)
-        print(f"{icon}【{risk}】音频 ({len(files)}个)")
-        
-        for res in files:
-            print(f"\n  📄 文件名: {res['filename']}")
-            print(f"     转录内容: \"{res['transcription']}\"")
-            
-            analysis = res.get("llm_analysis")
-            if analysis and "final_assessment" in analysis:
-                assessment = analysis["final_assessment"]
-                checks = analysis.get("legitimacy_checks", {})
-                
-                print(f"     合法性检查:")
-                print(f"       - 引导至官方渠道: {checks.get('official_channel_guidance', 'N/A')}")
-                print(f"       - 声明无害操作:   {checks.get('harmless_action_statement', 'N/A')}")
-                print(f"       - 信息同步为主:   {checks.get('is_information_sync', 'N/A')}")
-                
-                print(f"     最终评估:")
-                print(f"       - 诈骗类型: {assessment.get('scam_type', 'N/A')}")
-                print(f"       - 判断理由: {assessment.get('reasoning', 'N/A')}")
-            else:
-                print("     [分析失败或格式错误]")
-        print("-" * 80)
-            
-    print("\n报告结束。")
+    if audios is None:
+        audios = [None] * len(audio_paths)
+    inputs = [audio_path if audio is None else audio for audio_path, audio in zip(audio_paths, audios)]
+    try:
+        texts = transcribe_batch(asr_model, inputs, batch_size=batch_size, initial_prompt=PROMPT)
+    except Exception as e:
+        print(f"   [BATCH ASR ERROR] 批量转录失败，回退到逐条处理. Reason: {e}")
+        return [analyze_audio_for_scam(audio_path, analyze_text=analyze_text, audio=audio)
+                for audio_path, audio in zip(audio_paths, audios)]
+    return [analyze_audio_for_scam(audio_path, text, analyze_text) for audio_path, text in zip(audio_paths, texts)]
 
-# --- 【核心升级】性能评估函数，适配新JSON结构 ---
-def calculate_performance_metrics(all_results, scam_audio_count):
-    true_positive, false_positive, true_negative, false_negative = 0, 0, 0, 0
-    total_audios = len(all_results)
-    
-    for i, res in enumerate(all_results):
-        is_true_scam = (i < scam_audio_count)
-        
-        is_predicted_scam = False
-        llm_analysis = res.get("llm_analysis")
-        if llm_analysis and isinstance(llm_analysis, dict):
-            # 适配新的JSON结构
-            assessment = llm_analysis.get("final_assessment", {})
-            if isinstance(assessment, dict):
-                is_predicted_scam = assessment.get("is_scam", False) is True
-        
-        if is_true_scam and is_predicted_scam: true_positive += 1
-        elif not is_true_scam and is_predicted_scam: false_positive += 1
-        elif not is_true_scam and not is_predicted_scam: true_negative += 1
-        elif is_true_scam and not is_predicted_scam: false_negative += 1
-    
-    print("\n" + "="*80)
-    print("                 📈  模型性能评估统计 (V2 - 逻辑增强版)  📈")
-    print("="*80)
-    
-    print(f"测试集信息:\n  - 总样本数: {total_audios}\n  - 真实诈骗样本数 (Positive): {scam_audio_count}\n  - 真实正常样本数 (Negative): {total_audios - scam_audio_count}")
-    print("-" * 40)
-    print(f"混淆矩阵 (Confusion Matrix):\n  - 真正诈骗 (TP): {true_positive}\n  - 误报诈骗 (FP): {false_positive}\n  - 真正正常 (TN): {true_negative}\n  - 漏报诈骗 (FN): {false_negative}")
-    print("-" * 40)
-    
-    accuracy = (true_positive + true_negative) / total_audios if total_audios > 0 else 0
-    precision = true_positive / (true_positive + false_positive) if (true_positive + false_positive) > 0 else 0
-    recall = true_positive / (true_positive + false_negative) if (true_positive + false_negative) > 0 else 0
-    f1_score = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-    
-    print(f"核心性能指标:\n  - 准确率 (Accuracy): {accuracy:.2%}\n  - 精确率 (Precision): {precision:.2%}\n  - 召回率 (Recall): {recall:.2%}\n  - F1分数 (F1-Score): {f1_score:.2f}")
-    print("\n" + "="*80)
+def trim_for_asr(audio_path, cobra, pcm=None):
+    """
+    转录前用 Cobra VAD 裁掉静音和回铃音，返回 vad_trimmer.trim_pcm 的结果。
+    pcm 为分片语料中的 int16 采样（可选）；非 WAV 文件或读取失败时返回 None，按原始音频转录。
+    """
+    try:
+        if pcm is not None:
+            return trim_pcm(pcm, compute_voice_probabilities(pcm, cobra), cobra.frame_length, cobra.sample_rate)
+        if audio_path.lower().endswith(".wav"):
+            return trim_silence(audio_path, cobra)
+    except Exception as e:
+        print(f"   [VAD WARNING] 无法裁剪 {os.path.basename(audio_path)}，使用原始音频. Reason: {e}")
+    return None
 
 # --- 3. 批量运行分析 ---
 if __name__ == "__main__":
-    AUDIO_DIRECTORY = "call_cases2" 
+    AUDIO_DIRECTORY = "call_cases2" # 也可以是 audio_shards.py 转换出的分片语料目录
     REAL_SCAM_AUDIO_COUNT = 20 # 假设前20个是诈骗样本
+    RESULT_STORE_PATH = "analysis_results.jsonl" # 分析结果流式存储文件
+    RESUME = False # 仅在继续一次中断的运行时设为 True；False 时清空结果文件重新分析（换了提示词、模型或标注后务必为 False）
+    REPORT_TOP_N = 3 # 报告中每个风险等级展示的示例数
+    ASR_BATCH_SIZE = 8 # 每批一起解码的音频数
+    VAD_TRIM = False # 转录前用 Cobra VAD 裁掉静音和回铃音，只把语音部分交给 Whisper
+    PICOVOICE_ACCESS_KEY = "wnNixNAHoeM9gS9YpmUqTuchNvkY64zXHxxMeQ3haqrU0fGPEsNvmQ==" # VAD_TRIM 开启时使用
+    NEAR_DUP_THRESHOLD = 0.8 # 近重复文本复用判定的相似度阈值，设为 None 关闭复用
     
     supported_formats = ('.wav', '.mp3', '.m4a', '.flac', '.ogg')
 
@@ -232,24 +214,77 @@ if __name__ == "__main__":
     elif client is None:
         print("\n程序无法继续，因为 LLM 客户端初始化失败。")
     else:
-        audio_files = sorted([f for f in os.listdir(AUDIO_DIRECTORY) if f.lower().endswith(supported_formats)])
+        if is_shard_corpus(AUDIO_DIRECTORY):
+            shard_reader = ShardReader(AUDIO_DIRECTORY)
+            shard_index = {entry["name"]: i for i, entry in enumerate(shard_reader.entries)}
+            if len(shard_index) < len(shard_reader):
+                print(f"⚠️ 分片语料中有 {len(shard_reader) - len(shard_index)} 条重复的条目名，只分析其中一条；"
+                      f"请用新版 audio_shards.py 重新转换（条目名带来源目录）")
+            audio_files = sorted(shard_index)
+        else:
+            shard_reader = None
+            audio_files = sorted([f for f in os.listdir(AUDIO_DIRECTORY) if f.lower().endswith(supported_formats)])
         
         if not audio_files:
             print(f"在文件夹 '{AUDIO_DIRECTORY}' 中没有找到支持的音频文件。")
         else:
             print(f"在 '{AUDIO_DIRECTORY}' 中找到 {len(audio_files)} 个音频文件，准备进行反诈骗分析...\n")
             
-            all_analysis_results = []
             start_time = time.time()
-            
-            for filename in audio_files:
-                file_path = os.path.join(AUDIO_DIRECTORY, filename)
-                analysis_result = analyze_audio_for_scam(file_path)
-                all_analysis_results.append(analysis_result)
-            
-            end_time = time.time()
-            
-            print_scam_summary_report(all_analysis_results)
-            calculate_performance_metrics(all_analysis_results, REAL_SCAM_AUDIO_COUNT)
-            
-            print(f"总耗时: {end_time - start_time:.2f} 秒")
\ No newline at end of file
+            cobra = None
+            if VAD_TRIM:
+                import pvcobra
+                cobra = pvcobra.create(access_key=PICOVOICE_ACCESS_KEY)
+            verdict_cache = VerdictCache(analyze_scam_with_llm, NEAR_DUP_THRESHOLD) if NEAR_DUP_THRESHOLD else None
+            analyze_text = verdict_cache.analyze if verdict_cache else analyze_scam_with_llm
+
+            # 结果逐条追加写入存储文件；RESUME 开启时跳过已分析成功的文件，继续中断的运行
+            with ResultStore(RESULT_STORE_PATH, resume=RESUME) as store:
+                if store.total:
+                    print(f"从 '{RESULT_STORE_PATH}' 恢复了 {store.total} 条已有结果，将跳过其中 "
+                          f"{len(store.processed)} 个已分析成功的文件，分析失败的文件会重试。\n")
+                    if verdict_cache:
+                        for res in store.iter_results():
+                            if classify_risk(res) != "分析失败" and "reused_from" not in res["llm_analysis"]:
+                                verdict_cache.add(res["transcription"], res.get("llm_analysis"))
+
+                pending = [(i, filename) for i, filename in enumerate(audio_files) if filename not in store.processed]
+
+                for start in range(0, len(pending), ASR_BATCH_SIZE):
+                    chunk = pending[start:start + ASR_BATCH_SIZE]
+                    file_paths = [os.path.join(AUDIO_DIRECTORY, filename) for _, filename in chunk]
+                    audios, trims = [None] * len(chunk), [None] * len(chunk)
+                    for k, (_, filename) in enumerate(chunk):
+                        pcm = None
+                        if shard_reader is not None:
+                            pcm = np.frombuffer(shard_reader.pcm(shard_index[filename]), dtype=np.int16)
+                        if cobra is not None:
+                            trims[k] = trim_for_asr(file_paths[k], cobra, pcm)
+                        if trims[k]:
+                            audios[k] = trims[k]["audio"]
+                        elif pcm is not None:
+                            audios[k] = pcm.astype(np.float32) / 32768.0
+                    analysis_results = analyze_audio_batch_for_scam(
+                        file_paths, batch_size=ASR_BATCH_SIZE, analyze_text=analyze_text, audios=audios
+                    )
+                    for (i, filename), analysis_result, trim in zip(chunk, analysis_results, trims):
+                        # 分片语料的条目名带来源目录前缀，用完整条目名作为结果的文件名，避免同名文件在存储中互相覆盖
+                        analysis_result["filename"] = filename
+                        if trim:
+                            # 裁剪后时间轴 -> 原始录音时间轴: [(裁剪后起始秒, 原始起始秒, 时长秒), ...]
+                            analysis_result["vad_timestamp_map"] = trim["timestamp_map"]
+                        store.append(analysis_result, is_true_scam=(i < REAL_SCAM_AUDIO_COUNT))
+
+                end_time = time.time()
+
+                print_scam_summary_report(store, top_n=REPORT_TOP_N)
+                calculate_performance_metrics(store)
+
+            if cobra is not None:
+                cobra.delete()
+
+            if verdict_cache:
+                print(f"近重复复用: {verdict_cache.reused}/{verdict_cache.lookups} 条复用已有判定 "
+                      f"({verdict_cache.reuse_rate:.1%})，{verdict_cache.keyword_rejections} 条因风险关键词不同而重新分析")
+
+            print(f"总耗时: {end_time - start_time:.2f} 秒")
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+KWS 引擎并发来电压力 / 长稳测试
+把 WAV 语料（或 audio_shards.py 的分片语料）按实时速度回放成 N 路同时进行的模拟来电，
+送入 Cobra VAD + Porcupine 检测。Porcupine 和 Cobra 都是有状态的，所以每路来电独占一对检测器实例，
+整个通话期间固定在同一个工作进程上处理；工作进程数（进程池大小）可配置，可选绑定到单独的 CPU 核。
+
+两种模式:
+  ramp: 单进程绑定单核，逐级增加并发路数，找出每个核能稳定承载的最大来电数
+  soak: 多进程长时间运行，周期性报告帧处理延迟、丢帧数和内存增长
+
+每个工作进程模拟一个容量为 --buffer-ms 的实时采集缓冲区：处理落后超过缓冲区长度时，
+更早的帧被丢弃（计入丢帧数）并直接追到最新位置，与真实线路上的行为一致。
+用法:
+  python kws_soak_test.py ramp --levels 1 2 4 8 16 32 64
+  python kws_soak_test.py soak --calls 32 --workers 4 --duration-min 60
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import statistics
+import time
+import wave
+from typing import Dict, List, Tuple
+
+from audio_shards import ShardReader, is_shard_corpus
+
+DEFAULT_ACCESS_KEY = "wnNixNAHoeM9gS9YpmUqTuchNvkY64zXHxxMeQ3haqrU0fGPEsNvmQ=="
+DEFAULT_KEYWORD_PATHS = ["./验证码_zh_windows_v3_0_0.ppn"]
+DEFAULT_MODEL_PATH = "./porcupine_params_zh.pv"
+
+
+def read_rss(pid: int) -> int:
+    """读取进程当前 RSS（字节），读取失败返回 0"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def list_clip_sources(sources: List[str], max_clips: int) -> List[Tuple]:
+    """列出语料中的音频：WAV 文件为 ("wav", 路径)，分片语料为 ("shard", 目录, 下标)"""
+    clips = []
+    for source in sources:
+        if is_shard_corpus(source):
+            clips.extend(("shard", source, i) for i in range(len(ShardReader(source))))
+        elif os.path.isdir(source):
+            clips.extend(("wav", os.path.join(source, f)) for f in sorted(os.listdir(source))
+                         if f.lower().endswith(".wav"))
+        else:
+            print(f"⚠️ 文件夹不存在: {source}")
+    return clips[:max_clips]
+
+
+def _load_pcm(clip: Tuple, readers: Dict[str, ShardReader], sample_rate: int):
+    """返回 int16 memoryview；分片语料直接来自内存映射（多个进程共享页缓存）"""
+    if clip[0] == "shard":
+        _, corpus_dir, index = clip
+        if corpus_dir not in readers:
+            readers[corpus_dir] = ShardReader(corpus_dir)
+        return readers[corpus_dir].pcm(index)
+
+    with wave.open(clip[1], "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != sample_rate:
+            return None
+        return memoryview(wf.readframes(wf.getnframes())).cast("h")
+
+
+def _worker_main(worker_id: int, num_calls: int, clips: List[Tuple], config: Dict, stats_queue, stop_event):
+    import pvcobra
+    import pvporcupine
+
+    if config["cpu"] is not None:
+        os.sched_setaffinity(0, {config["cpu"]})
+
+    detectors = []
+    try:
+        # 每路来电独占一对检测器实例，通话期间固定在本进程处理
+        for _ in range(num_calls):
+            porcupine = pvporcupine.create(
+                access_key=config["access_key"], keyword_paths=config["keyword_paths"],
+                model_path=config["model_path"], sensitivities=[0.5] * len(config["keyword_paths"])
+            )
+            detectors.append((porcupine, pvcobra.create(access_key=config["access_key"])))
+
+        frame_length, sample_rate = detectors[0][0].frame_length, detectors[0][0].sample_rate
+        readers: Dict[str, ShardReader] = {}
+        pcms = [pcm for pcm in (_load_pcm(clip, readers, sample_rate) for clip in clips)
+                if pcm is not None and len(pcm) >= frame_length]
+        if not pcms:
+            raise ValueError(f"语料中没有可用的 {sample_rate}Hz 16-bit 单声道音频")
+
+        # 每路来电从不同的音频开始，连续播放（播完一条接着下一条）
+        calls = [[(worker_id * num_calls + c) % len(pcms), 0] for c in range(num_calls)]
+
+        def advance(call, frames):
+            call[1] += frames * frame_length
+            while call[1] + frame_length > len(pcms[call[0]]):
+                call[1] -= len(pcms[call[0]]) - len(pcms[call[0]]) % frame_length
+                call[0] = (call[0] + 1) % len(pcms)
+                call[1] = max(call[1], 0)
+
+        frame_seconds = frame_length / sample_rate
+        buffer_seconds = config["buffer_ms"] / 1000
+        lags, frames_processed, dropped, detections = [], 0, 0, 0
+
+        def report():
+            stats_queue.put({
+                "type": "stats", "worker": worker_id, "frames": frames_processed, "dropped": dropped,
+                "detections": detections, "lag_p50": percentile(lags, 50), "lag_p99": percentile(lags, 99),
+                "lag_max": max(lags) if lags else 0.0,
+            })
+
+        start = last_report = time.perf_counter()
+        tick = 0
+        stats_queue.put({"type": "ready", "worker": worker_id, "pid": os.getpid()})
+
+        while not stop_event.is_set():
+            arrival = start + (tick + 1) * frame_seconds
+            now = time.perf_counter()
+            if now < arrival:
+                time.sleep(arrival - now)
+            elif now - arrival > buffer_seconds:
+                # 落后超过采集缓冲区：缓冲区外的帧丢失，直接追到最新位置
+                skip = int((now - arrival - buffer_seconds) / frame_seconds) + 1
+                dropped += skip * num_calls
+                for call in calls:
+                    advance(call, skip)
+                tick += skip
+                continue
+
+            for (porcupine, cobra), call in zip(detectors, calls):
+                pcm = pcms[call[0]][call[1]:call[1] + frame_length]
+                if cobra.process(pcm) > config["vad_threshold"] and porcupine.process(pcm) >= 0:
+                    detections += 1
+                advance(call, 1)
+            done = time.perf_counter()
+            lags.append(done - arrival)
+            frames_processed += num_calls
+            tick += 1
+
+            if done - last_report >= config["report_interval"]:
+                report()
+                lags, frames_processed, dropped, detections = [], 0, 0, 0
+                last_report = done
+
+        # 停止时上报最后一个不完整周期，其中的丢帧和延迟尖峰同样要计入
+        if frames_processed or dropped:
+            report()
+    except Exception as e:
+        stats_queue.put({"type": "error", "worker": worker_id, "message": str(e)})
+    finally:
+        for porcupine, cobra in detectors:
+            porcupine.delete()
+            cobra.delete()
+        stats_queue.put({"type": "done", "worker": worker_id})
+
+
+def run_workers(calls_per_worker: List[int], clips: List[Tuple], config: Dict, duration: float, cpus=None,
+                on_report=None) -> List[Dict]:
+    """
+    启动工作进程运行 duration 秒，返回所有统计记录（含各进程停止时的最后一个不完整周期）。
+    on_report(records, rss) 在每个报告周期调用；最后一个周期的 rss 为 None。
+    """
+    stats_queue, stop_event = mp.Queue(), mp.Event()
+    workers = []
+    for worker_id, num_calls in enumerate(calls_per_worker):
+        worker_config = dict(config, cpu=cpus[worker_id % len(cpus)] if cpus else None)
+        worker = mp.Process(target=_worker_main,
+                            args=(worker_id, num_calls, clips, worker_config, stats_queue, stop_event), daemon=True)
+        worker.start()
+        workers.append(worker)
+
+    records, ready, pending = [], 0, []
+    finished = set()
+    deadline = None
+    try:
+        while True:
+            timeout = config["report_interval"] if deadline is None else max(0.0, deadline - time.perf_counter())
+            try:
+                record = stats_queue.get(timeout=max(timeout, 0.1))
+            except queue.Empty:
+                record = None
+
+            if record and record["type"] == "error":
+                print(f"❌ 工作进程 {record['worker']} 出错: {record['message']}")
+                break
+            if record and record["type"] == "done":
+                finished.add(record["worker"])
+            elif record and record["type"] == "ready":
+                ready += 1
+                if ready == len(workers):
+                    deadline = time.perf_counter() + duration
+            elif record:
+                records.append(record)
+                pending.append(record)
+                if len(pending) >= len(workers) and on_report:
+                    on_report(pending, sum(read_rss(w.pid) for w in workers))
+                    pending = []
+
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if not any(w.is_alive() for w in workers):
+                break
+    finally:
+        stop_event.set()
+        # 先收完各进程停止时上报的最后一个周期，再 join（队列里有未读数据时子进程也无法退出）
+        drain_deadline = time.perf_counter() + 10
+        while len(finished) < len(workers) and time.perf_counter() < drain_deadline:
+            try:
+                record = stats_queue.get(timeout=0.5)
+            except queue.Empty:
+                if not any(w.is_alive() for w in workers):
+                    break
+                continue
+            if record["type"] == "stats":
+                records.append(record)
+                pending.append(record)
+            elif record["type"] in ("done", "error"):
+                finished.add(record["worker"])
+        if pending and on_report:
+            # 进程已在退出，这一轮的内存数据不可靠，不参与内存增长统计
+            on_report(pending, None)
+        for worker in workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+    return records
+
+
+def summarize(records: List[Dict]) -> Dict:
+    frames = sum(r["frames"] for r in records)
+    dropped = sum(r["dropped"] for r in records)
+    return {
+        "frames": frames,
+        "dropped": dropped,
+        "drop_rate": dropped / (frames + dropped) if frames + dropped else 0.0,
+        "lag_p50_ms": statistics.median(r["lag_p50"] for r in records) * 1000 if records else 0.0,
+        "lag_p99_ms": max((r["lag_p99"] for r in records), default=0.0) * 1000,
+        "lag_max_ms": max((r["lag_max"] for r in records), default=0.0) * 1000,
+        "detections": sum(r["detections"] for r in records),
+    }
+
+
+def run_ramp(args, clips, config):
+    """单核逐级加压，找出稳定承载的最大并发路数"""
+    cpu = sorted(os.sched_getaffinity(0))[0]
+    print(f"📈 ramp 模式: 单进程绑定 CPU {cpu}，每级运行 {args.level_seconds}s，"
+          f"稳定条件: 无丢帧且 p99 延迟 < {args.max_lag_ms}ms")
+    print("=" * 80)
+    print(f"{'并发路数':>8} {'处理帧数':>10} {'丢帧':>8} {'p50(ms)':>9} {'p99(ms)':>9} {'max(ms)':>9} {'结论':>6}")
+    print("-" * 80)
+
+    sustainable = 0
+    for level in args.levels:
+        records = run_workers([level], clips, config, args.level_seconds, cpus=[cpu])
+        if not records:
+            print(f"{level:>8} 没有收到统计数据，停止加压")
+            break
+        stats = summarize(records)
+        ok = stats["dropped"] == 0 and stats["lag_p99_ms"] < args.max_lag_ms
+        print(f"{level:>8} {stats['frames']:>10} {stats['dropped']:>8} {stats['lag_p50_ms']:>9.1f} "
+              f"{stats['lag_p99_ms']:>9.1f} {stats['lag_max_ms']:>9.1f} {'✅' if ok else '❌':>6}")
+        if not ok:
+            break
+        sustainable = level
+    print("=" * 80)
+    print(f"每个 CPU 核最多可稳定承载 {sustainable} 路并发来电")
+
+
+def run_soak(args, clips, config):
+    """多进程长稳测试，周期性报告延迟、丢帧和内存"""
+    workers = min(args.workers, args.calls)
+    calls_per_worker = [args.calls // workers + (1 if i < args.calls % workers else 0) for i in range(workers)]
+    cpus = sorted(os.sched_getaffinity(0)) if args.pin_cores else None
+    print(f"🔁 soak 模式: {args.calls} 路来电，{workers} 个工作进程 {calls_per_worker}，运行 {args.duration_min} 分钟")
+    print("=" * 88)
+    print(f"{'时间(s)':>8} {'处理帧数':>10} {'丢帧':>8} {'p50(ms)':>9} {'p99(ms)':>9} {'max(ms)':>9} {'命中':>6} {'RSS(MB)':>9}")
+    print("-" * 88)
+
+    start = time.perf_counter()
+    memory_samples = []
+
+    def on_report(records, rss):
+        elapsed = time.perf_counter() - start
+        if rss is not None:
+            memory_samples.append((elapsed, rss))
+        stats = summarize(records)
+        rss_text = f"{rss / 2**20:.1f}" if rss is not None else "-"
+        print(f"{elapsed:>8.0f} {stats['frames']:>10} {stats['dropped']:>8} {stats['lag_p50_ms']:>9.1f} "
+              f"{stats['lag_p99_ms']:>9.1f} {stats['lag_max_ms']:>9.1f} {stats['detections']:>6} {rss_text:>9}")
+
+    records = run_workers(calls_per_worker, clips, config, args.duration_min * 60, cpus=cpus, on_report=on_report)
+    stats = summarize(records)
+
+    print("=" * 88)
+    print(f"📊 总计: 处理 {stats['frames']} 帧，丢帧 {stats['dropped']} ({stats['drop_rate']:.3%})，"
+          f"p99 延迟 {stats['lag_p99_ms']:.1f}ms，最大延迟 {stats['lag_max_ms']:.1f}ms，命中 {stats['detections']} 次")
+    # 排除启动阶段的样本后做线性回归，估计内存增长速度
+    steady = memory_samples[len(memory_samples) // 5:]
+    if len(steady) >= 2:
+        slope, _ = statistics.linear_regression([t for t, _ in steady], [rss for _, rss in steady])
+        print(f"   内存: {steady[0][1] / 2**20:.1f}MB -> {steady[-1][1] / 2**20:.1f}MB，"
+              f"增长速度 {slope * 3600 / 2**20:.2f} MB/小时")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cobra + Porcupine 并发来电压力 / 长稳测试')
+    parser.add_argument('--sources', nargs='+', default=['generated_audio_baidu_验证码'], help='WAV 目录或分片语料目录')
+    parser.add_argument('--max-clips', type=int, default=200, help='每个进程最多加载的音频数 (默认: 200)')
+    parser.add_argument('--access-key', default=DEFAULT_ACCESS_KEY, help='Picovoice AccessKey (默认: test_kws2.py 中的测试 Key)')
+    parser.add_argument('--keyword-paths', nargs='+', default=DEFAULT_KEYWORD_PATHS, help='关键词模型文件')
+    parser.add_argument('--model-path', default=DEFAULT_MODEL_PATH, help='Porcupine 中文模型文件')
+    parser.add_argument('--vad-threshold', type=float, default=0.2, help='VAD 阈值 (默认: 0.2)')
+    parser.add_argument('--buffer-ms', type=float, default=500, help='实时采集缓冲区长度，超过即丢帧 (默认: 500)')
+    parser.add_argument('--report-interval', type=float, default=10, help='统计上报周期，秒 (默认: 10)')
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    ramp_parser = subparsers.add_parser('ramp', help='单核逐级加压，测每核最大并发路数')
+    ramp_parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64, 128], help='并发路数列表')
+    ramp_parser.add_argument('--level-seconds', type=float, default=30, help='每级运行时间，秒 (默认: 30)')
+    ramp_parser.add_argument('--max-lag-ms', type=float, default=100, help='p99 延迟上限，毫秒 (默认: 100)')
+
+    soak_parser = subparsers.add_parser('soak', help='多进程长时间运行，观察延迟、丢帧和内存增长')
+    soak_parser.add_argument('--calls', type=int, default=32, help='并发来电路数 (默认: 32)')
+    soak_parser.add_argument('--workers', type=int, default=os.cpu_count(), help='工作进程数 (默认: CPU 核数)')
+    soak_parser.add_argument('--duration-min', type=float, default=60, help='运行时长，分钟 (默认: 60)')
+    soak_parser.add_argument('--pin-cores', action='store_true', help='每个工作进程绑定到一个 CPU 核')
+
+    args = parser.parse_args()
+
+    clips = list_clip_sources(args.sources, args.max_clips)
+    if not clips:
+        print("❌ 没有找到可用的音频。")
+        return
+
+    config = {
+        "access_key": args.access_key, "keyword_paths": args.keyword_paths, "model_path": args.model_path,
+        "vad_threshold": args.vad_threshold, "buffer_ms": args.buffer_ms, "report_interval": args.report_interval,
+    }
+    if args.mode == 'ramp':
+        run_ramp(args, clips, config)
+    else:
+        run_soak(args, clips, config)
+
+
+if __name__ == "__main__":
+    main()
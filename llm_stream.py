@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+LLM 流式响应解析与提前给出判定
+analyze_scam_with_llm 要等完整 JSON 返回后才 json.loads，而最长的 final_assessment.reasoning
+字段排在最后，大部分等待时间都花在预警路径并不需要的文本上。
+这里边接收流式输出边用增量 JSON 解析器解析，is_scam / risk_level 一解析出来就给出判定，
+reasoning 在后台线程中继续接收并补全。
+"""
+
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+VERDICT_PATHS = {("final_assessment", "is_scam"): "is_scam", ("final_assessment", "risk_level"): "risk_level"}
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+_LITERAL_CHARS = set("0123456789+-.eEtruefalsn")
+
+
+class IncrementalJSONParser:
+    """
+    逐字符解析 JSON 文本片段，每当一个标量值（字符串 / 数字 / 布尔 / null）完整时回调
+    on_value(path, value)，path 为从根开始的键名 / 下标元组，例如 ("final_assessment", "is_scam")。
+    on_partial_string(path, text) 在字符串值接收过程中回调，可用于展示正在生成的 reasoning。
+    """
+
+    def __init__(self, on_value: Optional[Callable[[Tuple, Any], None]] = None,
+                 on_partial_string: Optional[Callable[[Tuple, str], None]] = None):
+        self.on_value = on_value
+        self.on_partial_string = on_partial_string
+        self.values: Dict[Tuple, Any] = {}
+        self._text: List[str] = []
+        # 每层容器: [类型 "object"/"array", 当前键或下标, 期望的下一个符号]
+        self._stack: List[List] = []
+        self._string: Optional[List[str]] = None
+        self._string_is_key = False
+        self._escape = False
+        self._unicode: Optional[str] = None
+        self._literal: Optional[List[str]] = None
+
+    def _path(self) -> Tuple:
+        return tuple(frame[1] for frame in self._stack)
+
+    def _emit(self, value):
+        if self._stack:
+            path = self._path()
+            self.values[path] = value
+            if self.on_value:
+                self.on_value(path, value)
+            self._stack[-1][2] = "comma"
+
+    def _finish_string(self):
+        text = "".join(self._string)
+        if any("\ud800" <= c <= "\udfff" for c in text):
+            text = text.encode("utf-16", "surrogatepass").decode("utf-16")
+        self._string = None
+        if self._string_is_key:
+            self._stack[-1][1] = text
+            self._stack[-1][2] = "colon"
+        else:
+            self._emit(text)
+
+    def _consume_string_char(self, ch: str):
+        if self._unicode is not None:
+            self._unicode += ch
+            if len(self._unicode) == 4:
+                self._string.append(chr(int(self._unicode, 16)))
+                self._unicode = None
+        elif self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode = ""
+            else:
+                self._string.append(_ESCAPES.get(ch, ch))
+        elif ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            self._finish_string()
+            return
+        else:
+            self._string.append(ch)
+
+        if self.on_partial_string and not self._string_is_key and self._string is not None:
+            self.on_partial_string(self._path(), "".join(self._string))
+
+    def _consume(self, ch: str):
+        if self._string is not None:
+            self._consume_string_char(ch)
+            return
+
+        if self._literal is not None:
+            if ch in _LITERAL_CHARS:
+                self._literal.append(ch)
+                return
+            literal, self._literal = "".join(self._literal), None
+            self._emit(json.loads(literal))
+
+        if ch in " \t\r\n":
+            return
+        if ch == "{":
+            self._stack.append(["object", None, "key"])
+        elif ch == "[":
+            self._stack.append(["array", 0, "value"])
+        elif ch in "}]":
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][2] = "comma"
+        elif ch == '"':
+            self._string = []
+            self._string_is_key = bool(self._stack) and self._stack[-1][0] == "object" and self._stack[-1][2] == "key"
+        elif ch == ":":
+            self._stack[-1][2] = "value"
+        elif ch == ",":
+            frame = self._stack[-1]
+            if frame[0] == "object":
+                frame[2] = "key"
+            else:
+                frame[1] += 1
+                frame[2] = "value"
+        else:
+            self._literal = [ch]
+
+    def feed(self, chunk: str):
+        self._text.append(chunk)
+        for ch in chunk:
+            self._consume(ch)
+
+    def result(self) -> Dict:
+        """完整解析全部已接收文本（流结束后调用）"""
+        return json.loads("".join(self._text))
+
+
+class StreamingVerdict:
+    """
+    在后台线程中消费 LLM 流式输出。
+    wait_verdict() 在 is_scam 和 risk_level 都解析出来后立即返回；result() 等待完整结果（含 reasoning）。
+    不再需要结果时调用 close() 关闭底层 HTTP 流（stream 为提供 close() 的响应对象，例如 openai 的 Stream）。
+    """
+
+    def __init__(self, content_chunks, stream=None):
+        self.verdict: Dict[str, Any] = {}
+        self.partial_reasoning = ""
+        self.started_at = time.perf_counter()
+        self.verdict_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+        self._result: Optional[Dict] = None
+        self._stream = stream
+        self._closed = False
+        self._verdict_ready = threading.Event()
+        self._done = threading.Event()
+        self._parser = IncrementalJSONParser(self._on_value, self._on_partial_string)
+        self._thread = threading.Thread(target=self._consume, args=(content_chunks,), daemon=True)
+        self._thread.start()
+
+    def _on_value(self, path: Tuple, value):
+        field = VERDICT_PATHS.get(path)
+        if field and not self._verdict_ready.is_set():
+            self.verdict[field] = value
+            if len(self.verdict) == len(VERDICT_PATHS):
+                self.verdict_at = time.perf_counter()
+                self._verdict_ready.set()
+
+    def _on_partial_string(self, path: Tuple, text: str):
+        if path == ("final_assessment", "reasoning"):
+            self.partial_reasoning = text
+
+    def _consume(self, content_chunks):
+        try:
+            for chunk in content_chunks:
+                if self._closed:
+                    break
+                if chunk:
+                    self._parser.feed(chunk)
+            if self._closed:
+                self._result = {"error": "stream closed"}
+            else:
+                self._result = self._parser.result()
+        except Exception as e:
+            if not self._closed:
+                print(f"   [LLM ERROR] Streaming LLM response failed: {e}")
+            self._result = {"error": "stream closed" if self._closed else str(e)}
+        finally:
+            self.completed_at = time.perf_counter()
+            # 响应中缺少判定字段或出错时，也要让等待判定的一方返回
+            self._verdict_ready.set()
+            self._done.set()
+
+    def wait_verdict(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """等待 is_scam / risk_level；超时返回 None，流结束仍缺字段时返回已解析出的部分"""
+        if not self._verdict_ready.wait(timeout):
+            return None
+        return dict(self.verdict)
+
+    def close(self):
+        """放弃尚未接收的输出并关闭底层 HTTP 流；已完成的流调用无影响"""
+        if self._done.is_set():
+            return
+        self._closed = True
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except Exception:
+                pass
+
+    def result(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """等待完整的分析结果，结构与 analyze_scam_with_llm 的返回值相同"""
+        if not self._done.wait(timeout):
+            return None
+        return self._result
+
+
+def iter_completion_content(stream):
+    """从 OpenAI 兼容的流式 chat completion 中逐段取出文本"""
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def start_streaming_analysis(llm_client, messages: List[Dict], model_name: str = "deepseek-chat") -> StreamingVerdict:
+    """发起流式请求并立即返回 StreamingVerdict，请求参数与 analyze_scam_with_llm 保持一致"""
+    stream = llm_client.chat.completions.create(
+        model=model_name,
+        messages=messages,
+        response_format={"type": "json_object"},
+        temperature=0.0,
+        stream=True
+    )
+    return StreamingVerdict(iter_completion_content(stream), stream)
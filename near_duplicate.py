@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+转录文本近重复检测与判定复用
+诈骗话术和客服通知高度模板化（例如淘宝客服通知只有主题词不同），逐条调用 LLM 浪费配额。
+这里对转录文本的字符 n-gram 计算 MinHash 签名，用 LSH 分桶快速找到相似的已判定文本：
+相似度达到阈值、且两段文本包含的风险关键词一致时，直接复用已有判定；否则照常调用 LLM。
+"""
+
+import hashlib
+import random
+import re
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# 这些词出现与否的变化足以改变判定，即使整体相似度很高也要重新调用 LLM 确认
+RISK_KEYWORDS = ["验证码", "转账", "汇款", "安全账户", "银行卡", "密码", "屏幕共享", "微信", "QQ", "下载", "链接"]
+
+
+def char_shingles(text: str, k: int = 3) -> Set[str]:
+    """去掉标点和空白后，取长度为 k 的字符片段集合"""
+    text = re.sub(r'[\s，。、！？,.!?；;：:“”"‘’\'（）()]', '', text)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+class MinHashLSH:
+    """MinHash 签名 + LSH 分桶索引"""
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = random.Random(seed)
+        self._perms = [(rng.randint(1, MERSENNE_PRIME - 1), rng.randint(0, MERSENNE_PRIME - 1))
+                       for _ in range(num_perm)]
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(bands)]
+        self.signatures: List[Tuple[int, ...]] = []
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little')
+                  for s in char_shingles(text, self.shingle_size)]
+        if not hashes:
+            return tuple([MAX_HASH] * self.num_perm)
+        return tuple(
+            min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+            for a, b in self._perms
+        )
+
+    @staticmethod
+    def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+        """用签名中相同位置取值相等的比例估计 Jaccard 相似度"""
+        return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+    def _band_keys(self, sig: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, sig[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, sig: Tuple[int, ...]) -> int:
+        """加入一个签名，返回其编号"""
+        item_id = len(self.signatures)
+        self.signatures.append(sig)
+        for band, key in self._band_keys(sig):
+            self._buckets[band].setdefault(key, []).append(item_id)
+        return item_id
+
+    def query(self, sig: Tuple[int, ...]) -> Optional[Tuple[int, float]]:
+        """返回最相似的候选 (编号, 估计相似度)，没有候选时返回 None"""
+        candidates = set()
+        for band, key in self._band_keys(sig):
+            candidates.update(self._buckets[band].get(key, ()))
+        if not candidates:
+            return None
+        return max(((item_id, self.similarity(sig, self.signatures[item_id])) for item_id in candidates),
+                   key=lambda pair: pair[1])
+
+
+class VerdictCache:
+    """
+    包装 LLM 分析函数：近重复文本复用已有判定。
+    threshold 为估计 Jaccard 相似度阈值，越低复用率越高、误复用风险越大。
+    """
+
+    def __init__(self, analyze_text: Callable[[str], Dict], threshold: float = 0.8,
+                 num_perm: int = 128, bands: int = 32, shingle_size: int = 3):
+        self.analyze_text = analyze_text
+        self.threshold = threshold
+        self.index = MinHashLSH(num_perm=num_perm, bands=bands, shingle_size=shingle_size)
+        self._entries: List[Tuple[str, Dict]] = []
+        self.lookups = 0
+        self.reused = 0
+        self.keyword_rejections = 0
+
+    @staticmethod
+    def _risk_keywords(text: str) -> Set[str]:
+        return {keyword for keyword in RISK_KEYWORDS if keyword in text}
+
+    def lookup(self, text: str, sig: Optional[Tuple[int, ...]] = None) -> Optional[Dict]:
+        """
+        查找可复用的判定，返回附带来源信息的判定副本；没有可复用的判定时返回 None。
+        sig 为已经算好的 MinHash 签名（可选），未提供时由 text 计算。
+        """
+        if sig is None:
+            sig = self.index.signature(text)
+        match = self.index.query(sig)
+        if not match or match[1] < self.threshold:
+            return None
+
+        source_text, verdict = self._entries[match[0]]
+        # 廉价确认：风险关键词集合不同（例如模板中插入了“验证码”）时不复用
+        if self._risk_keywords(source_text) != self._risk_keywords(text):
+            self.keyword_rejections += 1
+            return None
+        return dict(verdict, reused_from={"transcription": source_text, "similarity": round(match[1], 3)})
+
+    def add(self, text: str, verdict: Dict, sig: Optional[Tuple[int, ...]] = None):
+        """登记一条已判定的文本；分析失败的结果不登记。sig 含义同 lookup"""
+        if not verdict or "error" in verdict:
+            return
+        self.index.add(self.index.signature(text) if sig is None else sig)
+        self._entries.append((text, verdict))
+
+    def analyze(self, text: str) -> Dict:
+        """与 analyze_scam_with_llm 用法相同：命中近重复时复用判定，否则调用 LLM 并登记结果"""
+        self.lookups += 1
+        sig = self.index.signature(text)
+        verdict = self.lookup(text, sig)
+        if verdict is not None:
+            self.reused += 1
+            return verdict
+
+        verdict = self.analyze_text(text)
+        self.add(text, verdict, sig)
+        return verdict
+
+    @property
+    def reuse_rate(self) -> float:
+        return self.reused / self.lookups if self.lookups else 0.0
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分析结果的流式存储
+每条结果分析完立即追加写入 JSONL 文件，风险分布和混淆矩阵以计数器形式实时累计，
+总结报告从存储文件中流式读取，每个风险等级只展示前 N 个示例，内存占用与样本总数无关。
+程序中途崩溃后重新运行可从存储文件恢复进度，跳过已分析的文件；分析失败的文件会在下次运行时重试，
+同一文件的多条记录只以最后一条为准。
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+RISK_LEVELS = ["高风险", "中风险", "低风险", "无风险", "分析失败"]
+RISK_ICONS = {"高风险": "🔥🔥🔥", "中风险": "⚠️", "低风险": "➡️", "无风险": "✅", "分析失败": "❌"}
+
+
+def classify_risk(res: Dict) -> str:
+    """返回单条分析结果所属的风险等级（无法识别的一律归为“分析失败”）"""
+    analysis = res.get("llm_analysis")
+    if res.get("transcription", "").startswith("Error:") or not analysis or "error" in analysis:
+        return "分析失败"
+    risk_level = analysis.get("final_assessment", {}).get("risk_level", "分析失败")
+    return risk_level if risk_level in RISK_LEVELS else "分析失败"
+
+
+def is_predicted_scam(res: Dict) -> bool:
+    """LLM 是否将该条结果判定为诈骗"""
+    llm_analysis = res.get("llm_analysis")
+    if llm_analysis and isinstance(llm_analysis, dict):
+        assessment = llm_analysis.get("final_assessment", {})
+        if isinstance(assessment, dict):
+            return assessment.get("is_scam", False) is True
+    return False
+
+
+class ResultStore:
+    """追加写入的 JSONL 结果存储，附带风险分布与混淆矩阵的实时计数器"""
+
+    def __init__(self, path: str, resume: bool = True):
+        self.path = Path(path)
+        self.total = 0
+        self.risk_counts = {level: 0 for level in RISK_LEVELS}
+        self.confusion = {"TP": 0, "FP": 0, "TN": 0, "FN": 0}
+        self.processed = set()
+        # 文件名 -> (记录序号, 风险等级, 混淆矩阵项)，用于重试后替换该文件之前的计数
+        self._latest: Dict[str, Tuple[int, str, str]] = {}
+        self._records = 0
+
+        if resume and self.path.exists():
+            self._replay()
+        else:
+            self.path.write_text("", encoding="utf-8")
+
+        self._fh = open(self.path, "a", encoding="utf-8")
+
+    def _replay(self):
+        """从已有文件恢复计数器；崩溃时写了一半的最后一行会被截掉"""
+        valid_size = 0
+        with open(self.path, "rb") as f:
+            for raw_line in f:
+                if not raw_line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(raw_line.decode("utf-8"))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    break
+                self._count(record)
+                valid_size += len(raw_line)
+
+        if valid_size < self.path.stat().st_size:
+            print(f"⚠️ 结果文件末尾存在不完整记录，已截断: {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_size)
+
+    def _count(self, record: Dict):
+        filename = record.get("filename")
+        previous = self._latest.get(filename)
+        if previous:
+            # 重试成功（或再次失败）的记录替换之前那条，不重复计入总数
+            _, old_risk, old_outcome = previous
+            self.total -= 1
+            self.risk_counts[old_risk] -= 1
+            self.confusion[old_outcome] -= 1
+
+        risk = classify_risk(record)
+        is_true_scam = record.get("is_true_scam", False)
+        is_scam = is_predicted_scam(record)
+        if is_true_scam and is_scam: outcome = "TP"
+        elif not is_true_scam and is_scam: outcome = "FP"
+        elif not is_true_scam and not is_scam: outcome = "TN"
+        else: outcome = "FN"
+
+        self.total += 1
+        self.risk_counts[risk] += 1
+        self.confusion[outcome] += 1
+        self._latest[filename] = (self._records, risk, outcome)
+        self._records += 1
+        # 分析失败的文件不算已处理，下次运行时重试
+        if risk == "分析失败":
+            self.processed.discard(filename)
+        else:
+            self.processed.add(filename)
+
+    def append(self, result: Dict, is_true_scam: bool):
+        """写入一条结果并立即落盘"""
+        record = dict(result, is_true_scam=is_true_scam)
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        self._count(record)
+
+    def iter_results(self) -> Iterator[Dict]:
+        """逐行读取存储中的结果，同一文件被重试过时只返回最后一条"""
+        self._fh.flush()
+        with open(self.path, "r", encoding="utf-8") as f:
+            index = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if self._latest.get(record.get("filename"), (index,))[0] == index:
+                    yield record
+                index += 1
+
+    def top_examples(self, top_n: int) -> Dict[str, List[Dict]]:
+        """单次扫描，为每个风险等级收集至多 top_n 个示例"""
+        examples = {level: [] for level in RISK_LEVELS}
+        remaining = sum(min(count, top_n) for count in self.risk_counts.values())
+        for res in self.iter_results():
+            if remaining <= 0:
+                break
+            bucket = examples[classify_risk(res)]
+            if len(bucket) < top_n:
+                bucket.append(res)
+                remaining -= 1
+        return examples
+
+    def close(self):
+        if self._fh and not self._fh.closed:
+            self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def print_scam_summary_report(store: ResultStore, top_n: int = 3):
+    """
+    从结果存储生成总结报告，包含合法性检查结果，以分析误报原因。
+    每个风险等级只展示前 top_n 个示例，完整结果见存储文件。
+    """
+    examples = store.top_examples(top_n)
+
+    print("\n" + "="*80)
+    print("           🚨  LLM 反诈骗智能分析总结报告 (V2 - 逻辑增强版)  🚨")
+    print("="*80)
+    print(f"总共分析了 {store.total} 个音频文件。完整结果已保存至: {store.path}\n")
+
+    for risk in RISK_LEVELS:
+        count = store.risk_counts[risk]
+        if not count:
+            continue
+
+        print(f"{RISK_ICONS[risk]}【{risk}】音频 ({count}个)")
+
+        for res in examples[risk]:
+            print(f"\n  📄 文件名: {res['filename']}")
+            print(f"     转录内容: \"{res['transcription']}\"")
+
+            analysis = res.get("llm_analysis")
+            if analysis and "final_assessment" in analysis:
+                assessment = analysis["final_assessment"]
+                checks = analysis.get("legitimacy_checks", {})
+
+                print(f"     合法性检查:")
+                print(f"       - 引导至官方渠道: {checks.get('official_channel_guidance', 'N/A')}")
+                print(f"       - 声明无害操作:   {checks.get('harmless_action_statement', 'N/A')}")
+                print(f"       - 信息同步为主:   {checks.get('is_information_sync', 'N/A')}")
+
+                print(f"     最终评估:")
+                print(f"       - 诈骗类型: {assessment.get('scam_type', 'N/A')}")
+                print(f"       - 判断理由: {assessment.get('reasoning', 'N/A')}")
+            else:
+                print("     [分析失败或格式错误]")
+
+        if count > len(examples[risk]):
+            print(f"\n  ... 其余 {count - len(examples[risk])} 个省略")
+        print("-" * 80)
+
+    print("\n报告结束。")
+
+
+def calculate_performance_metrics(store: ResultStore):
+    """根据结果存储中累计的混淆矩阵计算性能指标"""
+    true_positive = store.confusion["TP"]
+    false_positive = store.confusion["FP"]
+    true_negative = store.confusion["TN"]
+    false_negative = store.confusion["FN"]
+    total_audios = store.total
+    scam_audio_count = true_positive + false_negative
+
+    print("\n" + "="*80)
+    print("                 📈  模型性能评估统计 (V2 - 逻辑增强版)  📈")
+    print("="*80)
+
+    print(f"测试集信息:\n  - 总样本数: {total_audios}\n  - 真实诈骗样本数 (Positive): {scam_audio_count}\n  - 真实正常样本数 (Negative): {total_audios - scam_audio_count}")
+    print("-" * 40)
+    print(f"混淆矩阵 (Confusion Matrix):\n  - 真正诈骗 (TP): {true_positive}\n  - 误报诈骗 (FP): {false_positive}\n  - 真正正常 (TN): {true_negative}\n  - 漏报诈骗 (FN): {false_negative}")
+    print("-" * 40)
+
+    accuracy = (true_positive + true_negative) / total_audios if total_audios > 0 else 0
+    precision = true_positive / (true_positive + false_positive) if (true_positive + false_positive) > 0 else 0
+    recall = true_positive / (true_positive + false_negative) if (true_positive + false_negative) > 0 else 0
+    f1_score = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
+
+    print(f"核心性能指标:\n  - 准确率 (Accuracy): {accuracy:.2%}\n  - 精确率 (Precision): {precision:.2%}\n  - 召回率 (Recall): {recall:.2%}\n  - F1分数 (F1-Score): {f1_score:.2f}")
+    print("\n" + "="*80)
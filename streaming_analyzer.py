@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+实时来电流式分析（提前预警）
+音频边到达边处理：每收到 step 秒新音频，就对最近 window 秒（相邻窗口互相重叠）进行转录，
+并拼接成滚动转录文本；每隔 analysis_interval 秒、或检测到关键词时，对目前为止的转录文本
+重新调用 analyze_scam_with_llm。一旦 risk_level 达到“高风险”就立即停止并发出预警，
+不必等到通话结束。提供流式分析函数（analyze_scam_with_llm_stream）时，判定字段一生成就决定是否预警，
+不等 reasoning 生成完。
+可以从 WAV 文件离线回放（按实时速度或加速），统计从通话开始到发出预警的耗时。
+"""
+
+import argparse
+import difflib
+import os
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from llm_stream import StreamingVerdict
+
+SAMPLE_RATE = 16000
+ALERT_RISK_LEVEL = "高风险"
+DEFAULT_KEYWORDS = ["验证码", "转账", "汇款", "安全账户", "银行卡", "密码"]
+
+
+def merge_transcripts(rolling: str, new_text: str, min_overlap: int = 2) -> str:
+    """
+    把重叠窗口的新转录文本拼接到滚动转录末尾。
+    在滚动文本末尾查找与新文本最长的公共片段作为重叠部分，找不到时直接追加。
+    """
+    if not rolling:
+        return new_text
+    if not new_text:
+        return rolling
+    tail = rolling[-2 * len(new_text):]
+    match = difflib.SequenceMatcher(None, tail, new_text, autojunk=False).find_longest_match(
+        0, len(tail), 0, len(new_text)
+    )
+    if match.size < min_overlap:
+        return rolling + new_text
+    return rolling[:len(rolling) - len(tail) + match.a] + new_text[match.b:]
+
+
+class StreamingScamAnalyzer:
+    """滚动转录 + 定时/关键词触发的 LLM 分析，达到高风险时提前预警"""
+
+    def __init__(self, transcribe: Callable[[np.ndarray], str], analyze_text: Callable[[str], Dict],
+                 window_seconds: float = 10.0, step_seconds: float = 3.0, analysis_interval: float = 6.0,
+                 keywords: Optional[List[str]] = None, porcupine=None, keyword_names: Optional[List[str]] = None,
+                 analyze_text_stream: Optional[Callable[[str], Optional[StreamingVerdict]]] = None):
+        self.transcribe = transcribe
+        self.analyze_text = analyze_text
+        self.analyze_text_stream = analyze_text_stream
+        self.window_samples = int(window_seconds * SAMPLE_RATE)
+        self.step_samples = int(step_seconds * SAMPLE_RATE)
+        self.analysis_interval_samples = int(analysis_interval * SAMPLE_RATE)
+        self.keywords = DEFAULT_KEYWORDS if keywords is None else keywords
+        self.porcupine = porcupine
+        self.keyword_names = keyword_names or []
+
+        self.transcript = ""
+        self.samples_received = 0
+        self.llm_calls = 0
+        self.last_analysis: Optional[Dict] = None
+        self._pending_analysis: Optional[StreamingVerdict] = None
+        self._window = np.zeros(0, dtype=np.float32)
+        self._pcm_remainder = np.zeros(0, dtype=np.int16)
+        self._transcribed_at = 0
+        self._analyzed_at = 0
+        self._analyzed_transcript = ""
+        self._keyword_scanned = 0
+        self._trigger: Optional[str] = None
+
+    @property
+    def audio_seconds(self) -> float:
+        return self.samples_received / SAMPLE_RATE
+
+    def _detect_keyword_frames(self, chunk: np.ndarray):
+        """Porcupine 逐帧检测关键词，命中后立即转录当前窗口并触发 LLM 分析"""
+        pcm = np.concatenate([self._pcm_remainder, (np.clip(chunk, -1, 1) * 32767).astype(np.int16)])
+        frame_length = self.porcupine.frame_length
+        usable = len(pcm) - len(pcm) % frame_length
+        for i in range(0, usable, frame_length):
+            keyword_index = self.porcupine.process(pcm[i:i + frame_length].tolist())
+            if keyword_index >= 0:
+                self._trigger = f"Porcupine: {self.keyword_names[keyword_index]}"
+        self._pcm_remainder = pcm[usable:]
+
+    def _transcribe_window(self):
+        previous = self.transcript
+        self.transcript = merge_transcripts(previous, self.transcribe(self._window))
+        self._transcribed_at = self.samples_received
+
+        # 相邻窗口互相重叠，同一个关键词会出现在多个窗口的转录里；
+        # 只检查滚动文本中新增（或被改写）的部分，已经触发过的关键词不再重复触发
+        scan_from = min(self._keyword_scanned, len(os.path.commonprefix([previous, self.transcript])))
+        for keyword in self.keywords:
+            if self.transcript.find(keyword, max(0, scan_from - len(keyword) + 1)) >= 0:
+                self._trigger = f"文本关键词: {keyword}"
+                break
+        self._keyword_scanned = len(self.transcript)
+
+    def _analyze(self, reason: str) -> Optional[Dict]:
+        self._analyzed_at = self.samples_received
+        self._trigger = None
+        if not self.transcript or self.transcript == self._analyzed_transcript:
+            return None
+
+        self._analyzed_transcript = self.transcript
+        self.llm_calls += 1
+        if self._pending_analysis is not None:
+            # 新的分析覆盖更长的转录文本，上一次还在生成的 reasoning 不再需要，关闭其 HTTP 流
+            self._pending_analysis.close()
+            self._pending_analysis = None
+        streaming = self.analyze_text_stream(self.transcript) if self.analyze_text_stream else None
+        if streaming is not None:
+            # 只等判定字段，reasoning 在后台继续生成，由 full_analysis() 补全
+            self._pending_analysis = streaming
+            verdict = streaming.wait_verdict() or {}
+            risk_level = verdict.get("risk_level")
+            analysis = None
+        else:
+            analysis = self.analyze_text(self.transcript)
+            self._pending_analysis = None
+            self.last_analysis = analysis
+            if not analysis or "error" in analysis:
+                return None
+            assessment = analysis.get("final_assessment", {})
+            verdict = {"is_scam": assessment.get("is_scam"), "risk_level": assessment.get("risk_level")}
+            risk_level = verdict["risk_level"]
+
+        if risk_level == ALERT_RISK_LEVEL:
+            return {
+                "audio_seconds": self.audio_seconds,
+                "reason": reason,
+                "transcript": self.transcript,
+                "verdict": verdict,
+                "llm_analysis": analysis,
+            }
+        return None
+
+    def full_analysis(self) -> Optional[Dict]:
+        """等待最近一次流式分析的完整结果（含 reasoning），同时更新 last_analysis"""
+        if self._pending_analysis is not None:
+            self.last_analysis = self._pending_analysis.result()
+            self._pending_analysis = None
+        return self.last_analysis
+
+    def feed(self, chunk: np.ndarray) -> Optional[Dict]:
+        """送入一段新音频（16kHz float32），达到高风险时返回预警信息"""
+        self.samples_received += len(chunk)
+        self._window = np.concatenate([self._window, chunk])[-self.window_samples:]
+        if self.porcupine:
+            self._detect_keyword_frames(chunk)
+
+        if self._trigger or self.samples_received - self._transcribed_at >= self.step_samples:
+            self._transcribe_window()
+
+            if self._trigger:
+                return self._analyze(self._trigger)
+            if self.samples_received - self._analyzed_at >= self.analysis_interval_samples:
+                return self._analyze("定时分析")
+        return None
+
+    def finish(self) -> Optional[Dict]:
+        """通话结束：转录尚未处理的尾部音频，并对完整转录做最后一次分析"""
+        if self.samples_received > self._transcribed_at:
+            tail_samples = self.samples_received - self._transcribed_at
+            overlap = self.window_samples - self.step_samples
+            self._window = self._window[-min(len(self._window), tail_samples + overlap):]
+            self._transcribe_window()
+        return self._analyze("通话结束")
+
+
+def replay_wav(audio_path: str, analyzer: StreamingScamAnalyzer, speed: float = 1.0, chunk_ms: int = 100) -> Dict:
+    """
+    按实时速度（speed=1）或加速（speed>1，speed<=0 表示不等待）回放音频文件。
+    处理跟不上音频到达速度时不会丢弃数据，而是在后续块上追赶，预警耗时中会体现出处理延迟。
+    """
+    import whisper
+
+    audio = whisper.load_audio(audio_path)
+    chunk_samples = int(chunk_ms * SAMPLE_RATE / 1000)
+    start = time.perf_counter()
+    alert = None
+
+    for offset in range(0, len(audio), chunk_samples):
+        chunk = audio[offset:offset + chunk_samples]
+        if speed > 0:
+            arrival = start + (offset + len(chunk)) / SAMPLE_RATE / speed
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        alert = analyzer.feed(chunk)
+        if alert:
+            break
+    else:
+        alert = analyzer.finish()
+
+    time_to_alert = time.perf_counter() - start if alert else None
+    # 流式分析时预警只带判定，完整结果（含 reasoning）在预警之后补上
+    if alert and alert["llm_analysis"] is None:
+        alert["llm_analysis"] = analyzer.full_analysis()
+    else:
+        analyzer.full_analysis()
+
+    return {
+        "filename": os.path.basename(audio_path),
+        "call_seconds": len(audio) / SAMPLE_RATE,
+        "alert": alert,
+        "time_to_alert": time_to_alert,
+        "llm_calls": analyzer.llm_calls,
+        "transcript": analyzer.transcript,
+        "llm_analysis": analyzer.last_analysis,
+    }
+
+
+def load_default_backends():
+    """真实模型：Whisper 窗口转录 + DeepSeek 分析（普通 / 流式），导入 deepseek_analyzer 时会加载模型"""
+    import deepseek_analyzer
+    from batch_transcriber import transcribe_batch
+
+    def transcribe_window(window: np.ndarray) -> str:
+        return transcribe_batch(deepseek_analyzer.asr_model, [window])[0]
+
+    return transcribe_window, deepseek_analyzer.analyze_scam_with_llm, deepseek_analyzer.analyze_scam_with_llm_stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description='来电流式分析离线回放：滚动转录 + 高风险提前预警')
+    parser.add_argument('audio_dir', nargs='?', default='call_cases2', help='音频目录 (默认: call_cases2)')
+    parser.add_argument('--speed', type=float, default=1.0, help='回放速度倍数，<=0 表示不等待 (默认: 1.0 实时)')
+    parser.add_argument('--chunk-ms', type=int, default=100, help='每次送入的音频长度，毫秒 (默认: 100)')
+    parser.add_argument('--window', type=float, default=10.0, help='转录窗口长度，秒 (默认: 10)')
+    parser.add_argument('--step', type=float, default=3.0, help='每隔多少秒新音频转录一次，秒 (默认: 3)')
+    parser.add_argument('--analysis-interval', type=float, default=6.0, help='LLM 定时分析间隔，秒 (默认: 6)')
+    parser.add_argument('--keywords', nargs='*', default=DEFAULT_KEYWORDS, help='触发即时分析的文本关键词')
+    parser.add_argument('--limit', type=int, default=None, help='最多回放的文件数')
+    parser.add_argument('--no-stream', action='store_true', help='LLM 使用普通调用，等完整结果后再判断是否预警')
+    args = parser.parse_args()
+
+    supported_formats = ('.wav', '.mp3', '.m4a', '.flac', '.ogg')
+    audio_files = sorted(f for f in os.listdir(args.audio_dir) if f.lower().endswith(supported_formats))[:args.limit]
+    if not audio_files:
+        print(f"在文件夹 '{args.audio_dir}' 中没有找到支持的音频文件。")
+        return
+
+    transcribe_window, analyze_text, analyze_text_stream = load_default_backends()
+    if args.no_stream:
+        analyze_text_stream = None
+    results = []
+    for filename in audio_files:
+        print(f"-> Replaying: {filename} (x{args.speed})")
+        analyzer = StreamingScamAnalyzer(
+            transcribe_window, analyze_text, window_seconds=args.window, step_seconds=args.step,
+            analysis_interval=args.analysis_interval, keywords=args.keywords,
+            analyze_text_stream=analyze_text_stream
+        )
+        result = replay_wav(os.path.join(args.audio_dir, filename), analyzer, args.speed, args.chunk_ms)
+        results.append(result)
+
+        if result["alert"]:
+            alert = result["alert"]
+            print(f"   🚨 [ALERT] 音频 {alert['audio_seconds']:.1f}s / {result['call_seconds']:.1f}s 处发出预警，"
+                  f"耗时 {result['time_to_alert']:.1f}s，触发: {alert['reason']}，LLM 调用 {result['llm_calls']} 次")
+        else:
+            print(f"   ✅ 未达到高风险，LLM 调用 {result['llm_calls']} 次")
+
+    alerted = [r for r in results if r["alert"]]
+    print("\n" + "=" * 60)
+    print(f"📊 流式分析回放统计 ({len(results)} 个文件, 回放速度 x{args.speed})")
+    print(f"   发出预警: {len(alerted)} 个")
+    if alerted:
+        times = [r["time_to_alert"] for r in alerted]
+        positions = [r["alert"]["audio_seconds"] / r["call_seconds"] for r in alerted]
+        print(f"   预警耗时: 平均 {statistics.mean(times):.1f}s, 中位数 {statistics.median(times):.1f}s, 最长 {max(times):.1f}s")
+        print(f"   预警时已播放的通话比例: 平均 {statistics.mean(positions):.0%}")
+    print(f"   平均 LLM 调用次数: {statistics.mean(r['llm_calls'] for r in results):.1f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,42 @@ import wave
 from datetime import datetime
 import pvporcupine
 import pvcobra
+from audio_shards import ShardReader, is_shard_corpus
 
 
-# --- 函数：处理单个WAV文件（此函数无需修改） ---
-def process_wav_file(filepath, porcupine, cobra, keyword_names, vad_threshold):
+# --- 函数：处理音频帧序列 ---
+def process_frames(frames, porcupine, cobra, keyword_names, vad_threshold, voice_probs=None):
     """
-    使用Cobra VAD和Porcupine处理单个WAV文件。
+    使用Cobra VAD和Porcupine处理一段音频的帧序列（每帧 porcupine.frame_length 个 int16 采样）。
+    传入列表 voice_probs 时，逐帧的 Cobra 语音概率会追加到其中，并且命中关键词后继续跑完整段音频，
+    供 vad_trimmer.trim_silence 直接复用，不必再跑一遍 VAD。
+    返回: (检测到的关键词名称 str 或 None, 语音帧数 int, 总帧数 int)
+    """
+    speech_frames_count, total_frames_count = 0, 0
+    detected = None
+
+    for pcm in frames:
+        total_frames_count += 1
+
+        voice_prob = cobra.process(pcm)
+        if voice_probs is not None:
+            voice_probs.append(voice_prob)
+        if voice_prob > vad_threshold:
+            speech_frames_count += 1
+            if detected is None:
+                result = porcupine.process(pcm)
+                if result >= 0:
+                    detected = keyword_names[result]
+                    if voice_probs is None:
+                        break
+
+    return detected, speech_frames_count, total_frames_count
+
+
+# --- 函数：处理单个WAV文件 ---
+def process_wav_file(filepath, porcupine, cobra, keyword_names, vad_threshold, voice_probs=None):
+    """
+    使用Cobra VAD和Porcupine处理单个WAV文件，voice_probs 含义同 process_frames。
     返回: (检测到的关键词名称 str 或 错误信息 或 None, 语音帧数 int, 总帧数 int)
     """
     try:
@@ -18,24 +48,29 @@ def process_wav_file(filepath, porcupine, cobra, keyword_names, vad_threshold):
             if wf.getsampwidth() != 2: return "错误: 不是16-bit音频", 0, 0
             if wf.getframerate() != porcupine.sample_rate: return f"错误: 采样率不是 {porcupine.sample_rate}", 0, 0
 
-            num_frames, frame_length = wf.getnframes(), porcupine.frame_length
-            speech_frames_count, total_frames_count = 0, 0
+            frame_length = porcupine.frame_length
 
-            for i in range(0, num_frames, frame_length):
-                frame = wf.readframes(frame_length)
-                if len(frame) < frame_length * 2: break
+            def wav_frames():
+                while True:
+                    frame = wf.readframes(frame_length)
+                    if len(frame) < frame_length * 2: break
+                    yield struct.unpack_from("h" * frame_length, frame)
 
-                total_frames_count += 1
-                pcm = struct.unpack_from("h" * frame_length, frame)
+            return process_frames(wav_frames(), porcupine, cobra, keyword_names, vad_threshold, voice_probs)
 
-                if cobra.process(pcm) > vad_threshold:
-                    speech_frames_count += 1
-                    result = porcupine.process(pcm)
-                    if result >= 0:
-                        return keyword_names[result], speech_frames_count, total_frames_count
+    except Exception as e:
+        return f"处理异常: {e}", 0, 0
 
-            return None, speech_frames_count, total_frames_count
 
+# --- 函数：处理分片语料中的一条音频 ---
+def process_shard_clip(reader, index, porcupine, cobra, keyword_names, vad_threshold, voice_probs=None):
+    """
+    从打包分片语料（见 audio_shards.py）中读取一条音频并处理，帧数据直接来自内存映射，不做拷贝。
+    返回值与 process_wav_file 相同。
+    """
+    try:
+        return process_frames(reader.frames(index, porcupine.frame_length), porcupine, cobra, keyword_names,
+                              vad_threshold, voice_probs)
     except Exception as e:
         return f"处理异常: {e}", 0, 0
 
@@ -47,7 +82,7 @@ def main():
     keyword_paths = ["./验证码_zh_windows_v3_0_0.ppn"]
     keyword_names = ["验证码"]
     model_path = "./porcupine_params_zh.pv"
-    wav_dirs = ["generated_audio_baidu_验证码"]
+    wav_dirs = ["generated_audio_baidu_验证码"]  # 也可以是 audio_shards.py 转换出的分片语料目录
     vad_threshold = 0.2
     result_file = "detection_result_with_vad.txt"
 
@@ -86,16 +121,26 @@ def main():
                 out.write(f"\n📁 正在扫描目录: {wav_dir} (预期关键词: '{expected_keyword}')\n{'=' * 50}\n")
                 print(f"\n--- 正在处理目录: {wav_dir} (预期: '{expected_keyword}') ---")
 
-                for filename in sorted(os.listdir(wav_dir)):
-                    if not filename.lower().endswith(".wav"): continue
+                if is_shard_corpus(wav_dir):
+                    reader = ShardReader(wav_dir)
+                    clips = sorted((entry["name"], index) for index, entry in enumerate(reader.entries))
+                else:
+                    reader = None
+                    clips = [(filename, None) for filename in sorted(os.listdir(wav_dir))
+                             if filename.lower().endswith(".wav")]
 
+                for filename, index in clips:
                     total_files += 1
-                    filepath = os.path.join(wav_dir, filename)
                     print(f"🔍 正在分析文件: {filename}")
 
-                    detected_result, speech_frames, total_frames = process_wav_file(
-                        filepath, porcupine, cobra, keyword_names, vad_threshold
-                    )
+                    if reader is not None:
+                        detected_result, speech_frames, total_frames = process_shard_clip(
+                            reader, index, porcupine, cobra, keyword_names, vad_threshold
+                        )
+                    else:
+                        detected_result, speech_frames, total_frames = process_wav_file(
+                            os.path.join(wav_dir, filename), porcupine, cobra, keyword_names, vad_threshold
+                        )
 
                     out.write(f"🎧 文件: {filename}\n")
                     out.write(f"   VAD 信息: {speech_frames} / {total_frames} 帧被判断为语音。\n")
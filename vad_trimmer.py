@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+基于 Cobra VAD 的静音裁剪
+在送入 Whisper 之前，用 Cobra 逐帧计算语音概率，找出语音片段并按设定的前后余量合并，
+只把拼接后的语音部分交给转录模型，跳过回铃音和静音。
+同时保留裁剪后时间轴到原始音频时间轴的映射，方便把转录结果定位回原始录音。
+"""
+
+import wave
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def read_wav_pcm(filepath: str, sample_rate: int) -> np.ndarray:
+    """读取 16-bit 单声道 WAV，返回 int16 数组"""
+    with wave.open(filepath, 'rb') as wf:
+        if wf.getnchannels() != 1:
+            raise ValueError("不是单声道")
+        if wf.getsampwidth() != 2:
+            raise ValueError("不是16-bit音频")
+        if wf.getframerate() != sample_rate:
+            raise ValueError(f"采样率不是 {sample_rate}")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def compute_voice_probabilities(pcm: np.ndarray, cobra) -> List[float]:
+    """逐帧计算 Cobra 语音概率，不足一帧的尾部忽略"""
+    frame_length = cobra.frame_length
+    return [
+        cobra.process(pcm[i:i + frame_length].tolist())
+        for i in range(0, len(pcm) - frame_length + 1, frame_length)
+    ]
+
+
+def find_speech_segments(voice_probs: List[float], frame_length: int, sample_rate: int,
+                         vad_threshold: float = 0.2, padding_ms: int = 200,
+                         merge_gap_ms: int = 300) -> List[Tuple[int, int]]:
+    """
+    根据逐帧语音概率找出语音片段，返回 [(起始采样点, 结束采样点), ...]。
+    每个片段前后各扩展 padding_ms，间隔小于 merge_gap_ms 的相邻片段合并为一段。
+    """
+    total_samples = len(voice_probs) * frame_length
+    padding = int(padding_ms * sample_rate / 1000)
+    merge_gap = int(merge_gap_ms * sample_rate / 1000)
+
+    segments: List[Tuple[int, int]] = []
+    for index, prob in enumerate(voice_probs):
+        if prob <= vad_threshold:
+            continue
+        start = max(0, index * frame_length - padding)
+        end = min(total_samples, (index + 1) * frame_length + padding)
+        if segments and start - segments[-1][1] <= merge_gap:
+            segments[-1] = (segments[-1][0], max(segments[-1][1], end))
+        else:
+            segments.append((start, end))
+    return segments
+
+
+def map_to_original(trimmed_seconds: float, segments: List[Tuple[int, int]], sample_rate: int) -> float:
+    """把裁剪后音频中的时间点（秒）映射回原始音频的时间点（秒）"""
+    offset = int(trimmed_seconds * sample_rate)
+    for start, end in segments:
+        length = end - start
+        if offset < length:
+            return (start + offset) / sample_rate
+        offset -= length
+    return segments[-1][1] / sample_rate if segments else trimmed_seconds
+
+
+def trim_pcm(pcm: np.ndarray, voice_probs: List[float], frame_length: int, sample_rate: int,
+             vad_threshold: float = 0.2, padding_ms: int = 200, merge_gap_ms: int = 300) -> Dict:
+    """
+    根据已有的逐帧语音概率裁剪 int16 PCM 中的非语音部分。
+    返回字典:
+      - audio:            拼接后的语音，float32 [-1, 1]，可直接传给 whisper 的 transcribe
+      - segments:         原始音频中保留的片段 [(起始采样点, 结束采样点), ...]
+      - timestamp_map:    [(裁剪后起始秒, 原始起始秒, 时长秒), ...]
+      - original_seconds: 原始时长
+      - speech_seconds:   裁剪后时长
+    整段都没有检测到语音时，保留原始音频，避免把误判的静音文件直接丢弃。
+    """
+    segments = find_speech_segments(voice_probs, frame_length, sample_rate,
+                                    vad_threshold, padding_ms, merge_gap_ms)
+    if not segments:
+        segments = [(0, len(pcm))]
+
+    speech = np.concatenate([pcm[start:end] for start, end in segments])
+
+    timestamp_map, trimmed_start = [], 0
+    for start, end in segments:
+        timestamp_map.append((trimmed_start / sample_rate, start / sample_rate, (end - start) / sample_rate))
+        trimmed_start += end - start
+
+    return {
+        "audio": speech.astype(np.float32) / 32768.0,
+        "segments": segments,
+        "timestamp_map": timestamp_map,
+        "original_seconds": len(pcm) / sample_rate,
+        "speech_seconds": len(speech) / sample_rate,
+    }
+
+
+def trim_silence(filepath: str, cobra, vad_threshold: float = 0.2, padding_ms: int = 200,
+                 merge_gap_ms: int = 300, voice_probs: Optional[List[float]] = None) -> Dict:
+    """
+    裁剪单个 WAV 文件中的非语音部分，返回值同 trim_pcm。
+    voice_probs 为同一文件已经算好的逐帧语音概率（例如 test_kws2.process_frames 在关键词检测时收集的），
+    提供时直接复用，不再让 Cobra 重新跑一遍。
+    """
+    pcm = read_wav_pcm(filepath, cobra.sample_rate)
+    if voice_probs is None:
+        voice_probs = compute_voice_probabilities(pcm, cobra)
+    return trim_pcm(pcm, voice_probs, cobra.frame_length, cobra.sample_rate,
+                    vad_threshold, padding_ms, merge_gap_ms)